@@ -16,13 +16,32 @@
 """See docstring for FileZillaURLProvider class"""
 
 import base64
+import glob
+import hashlib
+import os
 import re
+import struct
+import sys
 from typing import List
 
-# pylint: disable=E0401
-from autopkglib import URLGetter
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+# The shared base class lives in the SharedProcessors folder of this repo.
+# Adding it to sys.path violates flake8 E402, hence the noqa comment. The
+# same lines are in every processor using it, hence duplicate-code.
+# pylint: disable=C0413,E0401,duplicate-code
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "SharedProcessors",
+    ),
+)
+from CachedPageURLProvider import (  # noqa: E402
+    PAGE_CACHE_INPUT_VARIABLES,
+    PAGE_CACHE_OUTPUT_VARIABLES,
+    CachedPageURLProvider,
+)
+
+# pylint: enable=C0413,E0401,duplicate-code
 
 __all__: List[str] = ["FileZillaURLProvider"]
 
@@ -31,19 +50,259 @@ FILEZILLA_BASE_URL: str = (
     "https://filezilla-project.org/download.php?show_all=1"
 )
 
+# Patterns are compiled once per process and shared by all runs
+CONTENTWRAPPER_PATTERN = re.compile(
+    r'<div([^>]*id=["\']contentwrapper["\'][^>]*)>(.*?)</div>',
+    re.DOTALL | re.IGNORECASE,
+)
+DIV_ATTRIBUTE_PATTERN = re.compile(
+    r'\b(v[123])=["\']([^"\']*)["\']', re.IGNORECASE
+)
+HREF_PATTERN = re.compile(r'href=["\'](.*?)["\']', re.IGNORECASE)
+VERSION_PATTERN = re.compile(r"FileZilla_(\d+\.\d+\.\d+)_macos")
+
+
+def _gf_multiply(a: int, b: int) -> int:
+    """Multiply two bytes in the AES finite field."""
+    product = 0
+    while b:
+        if b & 1:
+            product ^= a
+        a <<= 1
+        if a & 0x100:
+            a ^= 0x11B
+        b >>= 1
+    return product
+
+
+def _build_aes_tables():
+    """Build the AES S-box, its inverse and the decryption T-tables."""
+    sbox = [0] * 256
+    for value in range(256):
+        # Multiplicative inverse, 0 maps to 0
+        inverse = 0
+        if value:
+            inverse = next(
+                x for x in range(1, 256) if _gf_multiply(value, x) == 1
+            )
+        affine = inverse
+        for shift in range(1, 5):
+            affine ^= ((inverse << shift) | (inverse >> (8 - shift))) & 0xFF
+        sbox[value] = affine ^ 0x63
+
+    inv_sbox = [0] * 256
+    for value, substituted in enumerate(sbox):
+        inv_sbox[substituted] = value
+
+    td0 = []
+    for value in range(256):
+        byte = inv_sbox[value]
+        td0.append(
+            _gf_multiply(byte, 0x0E) << 24
+            | _gf_multiply(byte, 0x09) << 16
+            | _gf_multiply(byte, 0x0D) << 8
+            | _gf_multiply(byte, 0x0B)
+        )
+    td1 = [(word >> 8 | word << 24) & 0xFFFFFFFF for word in td0]
+    td2 = [(word >> 8 | word << 24) & 0xFFFFFFFF for word in td1]
+    td3 = [(word >> 8 | word << 24) & 0xFFFFFFFF for word in td2]
+
+    return sbox, inv_sbox, td0, td1, td2, td3
+
+
+# Built on first use of the pure-Python decryption
+_AES_TABLES = None
+
+
+def _aes_expand_key(key: bytes, sbox) -> List[int]:
+    """Expand the key into the words of the encryption key schedule."""
+    if len(key) not in (16, 24, 32):
+        raise ValueError(f"Invalid AES key length: {len(key)} bytes")
+
+    key_words = len(key) // 4
+    words = list(struct.unpack(f">{key_words}I", key))
+    rcon = 1
+    for index in range(key_words, 4 * (key_words + 7)):
+        word = words[index - 1]
+        if index % key_words == 0:
+            word = (
+                sbox[word >> 16 & 0xFF] << 24
+                | sbox[word >> 8 & 0xFF] << 16
+                | sbox[word & 0xFF] << 8
+                | sbox[word >> 24]
+            ) ^ (rcon << 24)
+            rcon = _gf_multiply(rcon, 2)
+        elif key_words > 6 and index % key_words == 4:
+            word = (
+                sbox[word >> 24] << 24
+                | sbox[word >> 16 & 0xFF] << 16
+                | sbox[word >> 8 & 0xFF] << 8
+                | sbox[word & 0xFF]
+            )
+        words.append(words[index - key_words] ^ word)
+    return words
+
+
+def _aes_decryption_round_keys(key: bytes, tables):
+    """Expand the key into the round keys of the equivalent inverse
+    cipher."""
+    sbox, _, td0, td1, td2, td3 = tables
+    words = _aes_expand_key(key, sbox)
+    rounds = len(words) // 4 - 1
+
+    # Reverse the round order and apply InvMixColumns to the inner rounds
+    round_keys = []
+    for round_index in range(rounds, -1, -1):
+        start = 4 * round_index
+        end = start + 4
+        round_words = words[start:end]
+        if 0 < round_index < rounds:
+            round_words = [
+                td0[sbox[word >> 24]]
+                ^ td1[sbox[word >> 16 & 0xFF]]
+                ^ td2[sbox[word >> 8 & 0xFF]]
+                ^ td3[sbox[word & 0xFF]]
+                for word in round_words
+            ]
+        round_keys.append(round_words)
+
+    return round_keys
+
+
+# The cipher state is kept in local integers, attribute or item access
+# would slow down the inner rounds considerably
+# pylint: disable=too-many-locals
+def _aes_decrypt_words(words, round_keys, tables) -> List[int]:
+    """Run the inverse cipher on 32 bit words, four words per block."""
+    _, inv_sbox, td0, td1, td2, td3 = tables
+    first_key = round_keys[0]
+    inner_keys = round_keys[1:-1]
+    k0, k1, k2, k3 = round_keys[-1]
+
+    plain = []
+    for offset in range(0, len(words), 4):
+        end = offset + 4
+        c0, c1, c2, c3 = words[offset:end]
+        s0 = c0 ^ first_key[0]
+        s1 = c1 ^ first_key[1]
+        s2 = c2 ^ first_key[2]
+        s3 = c3 ^ first_key[3]
+        for r0, r1, r2, r3 in inner_keys:
+            s0, s1, s2, s3 = (
+                td0[s0 >> 24]
+                ^ td1[s3 >> 16 & 0xFF]
+                ^ td2[s2 >> 8 & 0xFF]
+                ^ td3[s1 & 0xFF]
+                ^ r0,
+                td0[s1 >> 24]
+                ^ td1[s0 >> 16 & 0xFF]
+                ^ td2[s3 >> 8 & 0xFF]
+                ^ td3[s2 & 0xFF]
+                ^ r1,
+                td0[s2 >> 24]
+                ^ td1[s1 >> 16 & 0xFF]
+                ^ td2[s0 >> 8 & 0xFF]
+                ^ td3[s3 & 0xFF]
+                ^ r2,
+                td0[s3 >> 24]
+                ^ td1[s2 >> 16 & 0xFF]
+                ^ td2[s1 >> 8 & 0xFF]
+                ^ td3[s0 & 0xFF]
+                ^ r3,
+            )
+        plain.extend(
+            (
+                (
+                    inv_sbox[s0 >> 24] << 24
+                    | inv_sbox[s3 >> 16 & 0xFF] << 16
+                    | inv_sbox[s2 >> 8 & 0xFF] << 8
+                    | inv_sbox[s1 & 0xFF]
+                )
+                ^ k0,
+                (
+                    inv_sbox[s1 >> 24] << 24
+                    | inv_sbox[s0 >> 16 & 0xFF] << 16
+                    | inv_sbox[s3 >> 8 & 0xFF] << 8
+                    | inv_sbox[s2 & 0xFF]
+                )
+                ^ k1,
+                (
+                    inv_sbox[s2 >> 24] << 24
+                    | inv_sbox[s1 >> 16 & 0xFF] << 16
+                    | inv_sbox[s0 >> 8 & 0xFF] << 8
+                    | inv_sbox[s3 & 0xFF]
+                )
+                ^ k2,
+                (
+                    inv_sbox[s3 >> 24] << 24
+                    | inv_sbox[s2 >> 16 & 0xFF] << 16
+                    | inv_sbox[s1 >> 8 & 0xFF] << 8
+                    | inv_sbox[s0 & 0xFF]
+                )
+                ^ k3,
+            )
+        )
+
+    return plain
+
+
+# pylint: enable=too-many-locals
+
+
+def aes_cbc_decrypt(cipher: bytes, key: bytes, iv: bytes) -> bytes:
+    """
+    Decrypt AES-CBC data without external dependencies.
+
+    Table-driven implementation of the equivalent inverse cipher working on
+    32 bit words. The whole ciphertext is unpacked and packed at once.
+    Padding is left in place.
+    """
+    global _AES_TABLES  # pylint: disable=global-statement
+    if _AES_TABLES is None:
+        _AES_TABLES = _build_aes_tables()
+
+    if len(iv) != 16:
+        raise ValueError(f"Invalid IV length: {len(iv)} bytes")
+    if len(cipher) % 16:
+        raise ValueError("Ciphertext is not a multiple of the block size")
+
+    round_keys = _aes_decryption_round_keys(key, _AES_TABLES)
+    words = struct.unpack(f">{len(cipher) // 4}I", cipher)
+    decrypted = _aes_decrypt_words(words, round_keys, _AES_TABLES)
+
+    # Each block is chained with the previous ciphertext, the first with
+    # the IV
+    chain = struct.unpack(">4I", iv) + words[:-4]
+    return struct.pack(
+        f">{len(words)}I",
+        *(word ^ previous for word, previous in zip(decrypted, chain)),
+    )
+
+
+USER_AGENT: str = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_4) "
+    "AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/13.1 Safari/605.1.15"
+)
+
 
 # pylint: disable=E0239
-class FileZillaURLProvider(URLGetter):
+class FileZillaURLProvider(CachedPageURLProvider):
     """
     Provides URL to the latest FileZilla release.
 
-    Requires import of cryptography package:
+    Decryption of the download page uses the cryptography package if it is
+    installed, and a slower built-in implementation otherwise:
     sudo /Library/AutoPkg/Python3/Python.framework/Versions/Current/bin/pip3 \
         install cryptography
     """
 
+    cache_dir_variable = "payload_cache_dir"
+    page_name = "FileZilla download page"
+
     description = __doc__
     input_variables = {
+        **PAGE_CACHE_INPUT_VARIABLES,
         "ARCH": {
             "required": False,
             "default": "arm64",
@@ -51,6 +310,15 @@ class FileZillaURLProvider(URLGetter):
                 "Which architecture to download: 'arm64' (default), 'x86'."
             ),
         },
+        "ARCHS": {
+            "required": False,
+            "description": (
+                "Optional list of architectures to resolve from a single "
+                "page retrieval, e.g. ['arm64', 'x86']. Sets url_<arch> and "
+                "version_<arch> for each of them. url and version are set "
+                "for ARCH if it is listed, otherwise for the first entry."
+            ),
+        },
         "base_url": {
             "required": False,
             "description": (
@@ -59,10 +327,43 @@ class FileZillaURLProvider(URLGetter):
             ),
             "default": FILEZILLA_BASE_URL,
         },
+        "page_path": {
+            "required": False,
+            "description": (
+                "(Advanced) Path to a saved download page to process "
+                "offline instead of requesting base_url. Bypasses the "
+                "payload cache."
+            ),
+        },
+        "payload_cache_dir": {
+            "required": False,
+            "description": (
+                "Directory caching the download page and the links of its "
+                "decrypted payload, keyed by a digest of the encrypted "
+                "payload. The page is requested conditionally, an unchanged "
+                "page is neither decrypted nor parsed again. Defaults to "
+                "CACHE_DIR/FileZillaURLProvider, an empty string disables "
+                "the cache."
+            ),
+        },
     }
     output_variables = {
         "url": {"description": "URL to the latest FileZilla product release."},
         "version": {"description": "Resolved version number for the release"},
+        "filezilla_downloads": {
+            "description": (
+                "Dictionary with url and version per resolved architecture. "
+                "url_<arch> and version_<arch> are set as well."
+            )
+        },
+        "payload_cache_status": {
+            "description": (
+                "'not_modified' if the page was unchanged, 'hit' if the "
+                "page changed but not its payload, 'miss' if the payload "
+                "was decrypted, or 'disabled'."
+            )
+        },
+        **PAGE_CACHE_OUTPUT_VARIABLES,
     }
 
     def parse_version_from_url(self, url: str) -> str:
@@ -75,34 +376,55 @@ class FileZillaURLProvider(URLGetter):
         Returns:
             str: Extracted version number (e.g., "3.66.1")
         """
-        version_pattern = r"FileZilla_(\d+\.\d+\.\d+)_macos"
-        match = re.search(version_pattern, url)
+        match = VERSION_PATTERN.search(url)
 
         if match:
             return match.group(1)
 
         raise ValueError("Could not parse version from URL")
 
-    def parse_download_url(self, html_string: str, arch: str):
+    def parse_download_urls(self, html_string: str, archs: List[str]):
         """
-        Parse the download URL from the HTML string based on architecture.
+        Parse the download URLs for several architectures from the HTML
+        string in a single pass over its links.
 
-        The HTML contains download links for multiple architectures
-        and platforms.
+        Returns:
+            dict: Download URL per architecture
         """
+        return self.match_download_urls(
+            (match.group(1) for match in HREF_PATTERN.finditer(html_string)),
+            archs,
+        )
 
-        needle = f"macos-{arch}.app.tar.bz2"
+    def match_download_urls(self, hrefs, archs: List[str]):
+        """
+        Return the download URL per architecture from an iterable of
+        links, consuming it only until all architectures are found.
+        """
+        needles = {arch: f"macos-{arch}.app.tar.bz2" for arch in archs}
+        urls = {}
 
-        # Find all href links in the HTML
-        href_pattern = r'href=["\'](.*?)["\']'
-        hrefs = re.findall(href_pattern, html_string, re.IGNORECASE)
         for href in hrefs:
-            if needle in href:
-                return href
+            for arch, needle in needles.items():
+                if arch not in urls and needle in href:
+                    urls[arch] = href
+            if len(urls) == len(needles):
+                return urls
+
+        missing = ", ".join(arch for arch in archs if arch not in urls)
         raise ValueError(
-            f"Could not find download URL for architecture: {arch}"
+            f"Could not find download URL for architecture: {missing}"
         )
 
+    def parse_download_url(self, html_string: str, arch: str):
+        """
+        Parse the download URL from the HTML string based on architecture.
+
+        The HTML contains download links for multiple architectures
+        and platforms.
+        """
+        return self.parse_download_urls(html_string, [arch])[arch]
+
     def _validate_and_decode_attributes(self, content, attributes):
         """Validate and decode base64-encoded encryption parameters."""
         cipher_b64 = content
@@ -128,15 +450,43 @@ class FileZillaURLProvider(URLGetter):
         return cipher, iv, rawkey
 
     def _perform_aes_decryption(self, cipher, iv, rawkey):
-        """Perform AES-CBC decryption and remove padding."""
-        cipher_obj = Cipher(
-            algorithms.AES(rawkey), modes.CBC(iv), backend=default_backend()
-        )
-        decryptor = cipher_obj.decryptor()
-        padded_plaintext = decryptor.update(cipher) + decryptor.finalize()
+        """
+        Perform AES-CBC decryption and remove padding.
 
-        # Remove PKCS7 padding
-        padding_length = padded_plaintext[-1]
+        The cryptography package is imported on first use. Without it the
+        slower built-in implementation is used.
+        """
+        try:
+            # pylint: disable=import-outside-toplevel
+            from cryptography.hazmat.backends import default_backend
+            from cryptography.hazmat.primitives.ciphers import (
+                Cipher,
+                algorithms,
+                modes,
+            )
+        except ImportError:
+            self.output(
+                "cryptography package not found, using built-in AES "
+                "decryption",
+                2,
+            )
+            padded_plaintext = aes_cbc_decrypt(cipher, rawkey, iv)
+        else:
+            cipher_obj = Cipher(
+                algorithms.AES(rawkey),
+                modes.CBC(iv),
+                backend=default_backend(),
+            )
+            decryptor = cipher_obj.decryptor()
+            padded_plaintext = decryptor.update(cipher) + decryptor.finalize()
+
+        # Remove PKCS7 padding, a mismatch means key or layout changed
+        padding_length = padded_plaintext[-1] if padded_plaintext else 0
+        expected_padding = bytes([padding_length]) * padding_length
+        if not 1 <= padding_length <= 16 or not padded_plaintext.endswith(
+            expected_padding
+        ):
+            raise ValueError("Decrypted content has invalid PKCS7 padding")
         return padded_plaintext[:-padding_length]
 
     def decrypt_string(self, content: str, attributes: dict) -> str:
@@ -171,6 +521,9 @@ class FileZillaURLProvider(URLGetter):
         """
         Parse HTML string to extract div attributes using regex.
 
+        Only the first div with id="contentwrapper" is parsed, the search
+        starts right before its id instead of at every div of the page.
+
         Args:
             html_string (str): HTML string containing the div
 
@@ -178,63 +531,131 @@ class FileZillaURLProvider(URLGetter):
             dict: Dictionary with div content and attributes
         """
 
-        # Find div with id="contentwrapper"
-        div_pattern = r'<div[^>]*id=["\']contentwrapper["\'][^>]*>(.*?)</div>'
-        div_match = re.search(
-            div_pattern, html_string, re.DOTALL | re.IGNORECASE
-        )
+        div_match = None
+        marker = html_string.find("contentwrapper")
+        if marker != -1:
+            div_start = html_string.rfind("<div", 0, marker)
+            if div_start != -1:
+                div_match = CONTENTWRAPPER_PATTERN.match(
+                    html_string, div_start
+                )
+        if not div_match:
+            div_match = CONTENTWRAPPER_PATTERN.search(html_string)
 
         if not div_match:
             raise ValueError("Could not find div with id 'contentwrapper'")
 
-        full_div = div_match.group(0)
-        content = div_match.group(1).strip()
+        content = div_match.group(2).strip()
 
-        # Extract attributes
+        # Extract v1, v2, v3 attributes from the opening tag
         attributes = {}
-
-        # Extract v1, v2, v3 attributes
-        for attr in ["v1", "v2", "v3"]:
-            attr_pattern = rf'{attr}=["\']([^"\']*)["\']'
-            attr_match = re.search(attr_pattern, full_div, re.IGNORECASE)
-            if attr_match:
-                attributes[attr] = attr_match.group(1)
+        for attr_match in DIV_ATTRIBUTE_PATTERN.finditer(div_match.group(1)):
+            attributes.setdefault(
+                attr_match.group(1).lower(), attr_match.group(2)
+            )
 
         return {"content": content, "attributes": attributes}
 
-    def get_filezilla_download_page(self, url: str) -> str:
-        """Retrieve the FileZilla download page HTML content."""
-        header = {
-            "user-agent": (
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_4) "
-                "AppleWebKit/605.1.15 (KHTML, like Gecko) "
-                "Version/13.1 Safari/605.1.15"
+    def payload_digest(self, div_data):
+        """Return a digest of the encrypted payload and its parameters."""
+        digest = hashlib.sha256()
+        for part in (
+            div_data["content"],
+            div_data["attributes"].get("v1", ""),
+            div_data["attributes"].get("v2", ""),
+            div_data["attributes"].get("v3", ""),
+        ):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_download_links(self, base_url, page_path=None):
+        """
+        Return all links of the decrypted download page. They are reused
+        without decryption if neither the page nor its payload changed.
+        """
+        with self.stage("fetch"):
+            if page_path:
+                self.page = {}
+                with open(page_path, encoding="utf-8") as page:
+                    html = page.read()
+            else:
+                self.fetch_page(base_url, headers={"user-agent": USER_AGENT})
+                links = self.page_result("links")
+                if links is not None:
+                    self.env["payload_cache_status"] = "not_modified"
+                    return links
+                html = self.read_page()
+
+        with self.stage("parse"):
+            div_data = self.parse_html_div(html)
+
+        cache_dir = "" if page_path else self.get_page_cache_dir()
+        digest = self.payload_digest(div_data)
+        payload_path = os.path.join(cache_dir, f"payload-{digest}.json")
+        cached = self.read_json(payload_path) if cache_dir else {}
+
+        if cached:
+            self.env["payload_cache_status"] = "hit"
+        else:
+            self.env["payload_cache_status"] = (
+                "miss" if cache_dir else "disabled"
             )
-        }
-        response = self.download(url, text=True, headers=header)
-        return response
+            with self.stage("decrypt"):
+                html = self.decrypt_string(
+                    div_data["content"], div_data["attributes"]
+                )
+            with self.stage("links"):
+                links = [
+                    match.group(1) for match in HREF_PATTERN.finditer(html)
+                ]
+                if not links:
+                    raise ValueError("Decrypted content contains no links")
+            cached = {"links": links}
+
+            if cache_dir:
+                # Only the payload of the current page is kept
+                for old_path in glob.glob(
+                    os.path.join(cache_dir, "payload-*.json")
+                ):
+                    os.remove(old_path)
+                self.write_json(payload_path, cached)
+
+        self.store_page_result("links", cached["links"])
+
+        return cached["links"]
 
     def main(self):
         """Provide a FileZilla download URL"""
         # Determine product_name, release, locale, and base_url.
         arch = self.env.get("ARCH", "arm64")
+        archs = self.env.get("ARCHS") or [arch]
+        if isinstance(archs, str):
+            archs = [archs]
+        if arch not in archs:
+            arch = archs[0]
         base_url = self.env.get("base_url", FILEZILLA_BASE_URL)
-
-        # Download the FileZilla download page
-        download_page_html = self.get_filezilla_download_page(base_url)
-
-        # Parse the HTML to extract the encrypted div content and attributes
-        div_data = self.parse_html_div(download_page_html)
-
-        # Decrypt the content to get the actual download URLs as HTML
-        div_data["content"] = self.decrypt_string(
-            div_data["content"], div_data["attributes"]
-        )
-
-        self.env["url"] = self.parse_download_url(div_data["content"], arch)
-
-        self.env["version"] = self.parse_version_from_url(self.env["url"])
-        self.output(f"Found URL {self.env['url']}")
+        self.stage_timings = {}
+
+        links = self.get_download_links(base_url, self.env.get("page_path"))
+        self.output(f"Payload cache: {self.env['payload_cache_status']}", 2)
+        with self.stage("links"):
+            urls = self.match_download_urls(links, archs)
+
+        downloads = {}
+        for current_arch, url in urls.items():
+            with self.stage("version"):
+                version = self.parse_version_from_url(url)
+            downloads[current_arch] = {"url": url, "version": version}
+            self.env[f"url_{current_arch}"] = url
+            self.env[f"version_{current_arch}"] = version
+            self.output(f"Found URL {url}")
+        self.env["filezilla_downloads"] = downloads
+
+        self.env["url"] = downloads[arch]["url"]
+        self.env["version"] = downloads[arch]["version"]
+
+        self.report_stage_timings()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,251 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""See docstring for CachedPageURLProvider class"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from time import perf_counter, time
+
+# pylint: disable=E0401
+from autopkglib import ProcessorError
+from autopkglib.URLGetter import URLGetter
+
+__all__ = [
+    "CachedPageURLProvider",
+    "PAGE_CACHE_INPUT_VARIABLES",
+    "PAGE_CACHE_OUTPUT_VARIABLES",
+]
+
+# Input and output variables shared by all subclasses, merged into their own
+PAGE_CACHE_INPUT_VARIABLES = {
+    "page_cache_ttl": {
+        "required": False,
+        "description": (
+            "Seconds a cached vendor page is used without asking the "
+            "server. Afterwards it is revalidated with a conditional "
+            "request. 0 revalidates on every run."
+        ),
+    },
+}
+PAGE_CACHE_OUTPUT_VARIABLES = {
+    "page_cache_status": {
+        "description": "How the vendor page was retrieved: hit, "
+        "revalidated, miss or disabled."
+    },
+    "stage_timings": {
+        "description": "Milliseconds spent per stage of the provider."
+    },
+}
+
+
+class CachedPageURLProvider(URLGetter):
+    """Base class for URL providers that scrape a vendor page.
+
+    Provides a conditional GET page cache in a per-provider folder of
+    CACHE_DIR, per-stage timing and results that are reused as long as the
+    page is unchanged. Subclasses
+    import it from the SharedProcessors folder and implement main."""
+
+    # Input variable overriding the cache folder, empty disables the cache
+    cache_dir_variable = "page_cache_dir"
+    default_page_cache_ttl = 0
+    # Name of the page in error messages
+    page_name = "vendor page"
+
+    def __init__(self, env=None, infile=None, outfile=None):
+        super().__init__(env, infile, outfile)
+        self.stage_timings = {}
+        self.page = {}
+
+    def get_page_cache_dir(self):
+        """Return the page cache directory, empty if caching is disabled."""
+        cache_dir = self.env.get(self.cache_dir_variable)
+        if cache_dir is not None:
+            return cache_dir
+
+        if not self.env.get("CACHE_DIR"):
+            return ""
+
+        return os.path.join(self.env["CACHE_DIR"], self.__class__.__name__)
+
+    def read_json(self, path):
+        """Return the content of a JSON cache file, empty if unreadable."""
+        try:
+            with open(path, encoding="utf-8") as json_file:
+                return json.load(json_file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_json(self, path, data):
+        """Atomically write a JSON cache file."""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as json_file:
+            json.dump(data, json_file)
+        os.replace(temp_path, path)
+
+    def fetch_page(self, url, headers=None):
+        """
+        Retrieve a page and return it as dictionary with url, status, meta
+        and either the path of the cached body or, with the cache disabled,
+        the body itself as data.
+
+        A cached page younger than page_cache_ttl is used as is, an older
+        one is revalidated with If-None-Match and If-Modified-Since.
+        """
+        headers = dict(headers or {})
+        cache_dir = self.get_page_cache_dir()
+        if not cache_dir:
+            self.page = {
+                "url": url,
+                "status": "disabled",
+                "path": None,
+                "data": self.download(url, headers=headers),
+                "meta": {},
+            }
+            self.env["page_cache_status"] = "disabled"
+            return self.page
+
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        body_path = os.path.join(cache_dir, f"{cache_name}.html")
+        meta_path = os.path.join(cache_dir, f"{cache_name}.json")
+
+        meta = {}
+        if os.path.exists(body_path):
+            meta = self.read_json(meta_path)
+
+        ttl = self.env.get("page_cache_ttl")
+        if ttl in (None, ""):
+            ttl = self.default_page_cache_ttl
+        ttl = float(ttl)
+        if meta and time() - meta.get("fetched", 0) < ttl:
+            status = "hit"
+        else:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+            temp_path = f"{body_path}.{os.getpid()}.tmp"
+            curl_cmd = self.prepare_curl_cmd()
+            self.add_curl_headers(curl_cmd, headers)
+            curl_cmd.extend(["--dump-header", "-", "--output", temp_path, url])
+            try:
+                header = self.parse_headers(self.download_with_curl(curl_cmd))
+                result_code = header.get("http_result_code")
+
+                if result_code == "304" and meta:
+                    status = "revalidated"
+                elif result_code == "200":
+                    os.replace(temp_path, body_path)
+                    meta = {
+                        "url": url,
+                        "etag": header.get("etag", ""),
+                        "last_modified": header.get("last-modified", ""),
+                        "results": {},
+                    }
+                    status = "miss"
+                else:
+                    raise ProcessorError(
+                        f"Unable to download {url}, HTTP status "
+                        f"{result_code}."
+                    )
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            meta["fetched"] = time()
+            self.write_json(meta_path, meta)
+
+        self.page = {
+            "url": url,
+            "status": status,
+            "path": body_path,
+            "data": None,
+            "meta": meta,
+            "meta_path": meta_path,
+        }
+        self.env["page_cache_status"] = status
+        self.output(f"Page cache for {url}: {status}", 2)
+
+        return self.page
+
+    def read_page(self, page=None):
+        """Return the body of a fetched page as text."""
+        page = page or self.page
+        if page["data"] is not None:
+            data = page["data"]
+            if isinstance(data, bytes):
+                data = data.decode("utf-8", errors="replace")
+            return data
+
+        with open(page["path"], encoding="utf-8", errors="replace") as body:
+            return body.read()
+
+    def page_result(self, key):
+        """
+        Return the result stored for key with the current page, None if
+        the page changed since it was stored.
+        """
+        if self.page.get("status") not in ("hit", "revalidated"):
+            return None
+
+        return self.page["meta"].get("results", {}).get(key)
+
+    def store_page_result(self, key, value):
+        """Store a JSON serializable result derived from the current page,
+        it is dropped as soon as the page changes."""
+        if not self.page.get("meta_path"):
+            return
+
+        self.page["meta"].setdefault("results", {})[key] = value
+        self.write_json(self.page["meta_path"], self.page["meta"])
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a stage of the provider and turn a ValueError into a
+        ProcessorError naming the stage, as it indicates format drift.
+        """
+        start = perf_counter()
+        try:
+            yield
+        except ValueError as err:
+            raise ProcessorError(
+                f"Unexpected {self.page_name} format in stage '{name}': "
+                f"{err}"
+            ) from err
+        finally:
+            self.stage_timings[name] = (
+                self.stage_timings.get(name, 0.0) + perf_counter() - start
+            )
+
+    def report_stage_timings(self):
+        """Set stage_timings in milliseconds and print them."""
+        self.env["stage_timings"] = {
+            name: round(seconds * 1000, 1)
+            for name, seconds in self.stage_timings.items()
+        }
+        self.output(
+            "Stage timings: "
+            + ", ".join(
+                f"{name} {milliseconds} ms"
+                for name, milliseconds in self.env["stage_timings"].items()
+            ),
+            2,
+        )
@@ -0,0 +1,390 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""See docstring for ChunkedURLDownloader class"""
+
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from urllib.parse import unquote, urlparse
+
+# pylint: disable=E0401
+from autopkglib import ProcessorError
+from autopkglib.URLGetter import URLGetter
+
+__all__ = ["ChunkedURLDownloader"]
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+DEFAULT_CHUNK_RETRIES = 3
+DEFAULT_CHUNK_RETRY_DELAY = 1
+
+
+class ChunkedURLDownloader(URLGetter):
+    """Downloads a URL to the specified download_dir using several parallel
+    HTTP range requests. Interrupted downloads are resumed from the chunks
+    already received. Falls back to a single request if the server does
+    not support ranges."""
+
+    description = __doc__
+    input_variables = {
+        "url": {"required": True, "description": "The URL to download."},
+        "download_dir": {
+            "required": False,
+            "description": (
+                "The directory where the file will be downloaded to. "
+                "Defaults to RECIPE_CACHE_DIR/downloads."
+            ),
+        },
+        "filename": {
+            "required": False,
+            "description": "Filename to override the URL's tail.",
+        },
+        "request_headers": {
+            "required": False,
+            "description": "Optional dictionary of headers to include.",
+        },
+        "curl_opts": {
+            "required": False,
+            "description": (
+                "Optional array of curl options to include with the "
+                "download request, as with URLDownloader. --compressed is "
+                "ignored, as it breaks byte ranges."
+            ),
+        },
+        "connections": {
+            "required": False,
+            "description": (
+                "Number of parallel range requests. Defaults to "
+                f"{DEFAULT_CONNECTIONS}."
+            ),
+            "default": DEFAULT_CONNECTIONS,
+        },
+        "chunk_size": {
+            "required": False,
+            "description": (
+                "Size of a single range request in bytes. Defaults to "
+                f"{DEFAULT_CHUNK_SIZE}."
+            ),
+            "default": DEFAULT_CHUNK_SIZE,
+        },
+        "chunk_retries": {
+            "required": False,
+            "description": (
+                "How often a failed range request is retried before the "
+                f"download fails. Defaults to {DEFAULT_CHUNK_RETRIES}."
+            ),
+            "default": DEFAULT_CHUNK_RETRIES,
+        },
+        "chunk_retry_delay": {
+            "required": False,
+            "description": (
+                "Seconds to wait before the first retry of a range "
+                "request, doubled for every further retry. Defaults to "
+                f"{DEFAULT_CHUNK_RETRY_DELAY}."
+            ),
+            "default": DEFAULT_CHUNK_RETRY_DELAY,
+        },
+    }
+    output_variables = {
+        "pathname": {"description": "Path to the downloaded file."},
+        "download_changed": {
+            "description": (
+                "Boolean indicating if the download has changed since the "
+                "last time it was downloaded."
+            )
+        },
+        "etag": {"description": "ETag header of the downloaded file."},
+        "last_modified": {
+            "description": "Last-Modified header of the downloaded file."
+        },
+        "url_downloader_summary_result": {
+            "description": "Description of interesting results."
+        },
+    }
+
+    def __init__(self, env=None, infile=None, outfile=None):
+        super().__init__(env, infile, outfile)
+        self.state_lock = threading.Lock()
+
+    def base_curl_cmd(self):
+        """Return a curl command with request_headers and curl_opts, but
+        without compression, which would break byte ranges."""
+
+        curl_cmd = [
+            self.curl_binary(),
+            "--location",
+            "--silent",
+            "--show-error",
+            "--fail",
+        ]
+        self.add_curl_common_opts(curl_cmd)
+
+        return [option for option in curl_cmd if option != "--compressed"]
+
+    def get_remote_info(self, url):
+        """Return size, validators and range support of the remote file.
+        If the server does not answer HEAD requests, all of them are unknown
+        and the file is fetched with a single GET like URLDownloader does."""
+
+        curl_cmd = self.base_curl_cmd()
+        curl_cmd.extend(["--head", url])
+        try:
+            header = self.parse_headers(self.download_with_curl(curl_cmd))
+            result = header.get("http_result_code")
+        except ProcessorError as err:
+            header, result = {}, str(err).strip()
+
+        if result != "200":
+            self.output(f"HEAD request for {url} failed ({result})")
+            header = {}
+
+        size = header.get("content-length", "")
+
+        return {
+            "url": url,
+            "size": int(size) if size.isdigit() else 0,
+            "etag": header.get("etag", ""),
+            "last_modified": header.get("last-modified", ""),
+            "ranges": header.get("accept-ranges", "").lower() == "bytes",
+        }
+
+    def load_state(self, state_path):
+        """Return the saved download state, if any."""
+
+        if not os.path.exists(state_path):
+            return {}
+
+        try:
+            with open(state_path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, state_path, state):
+        """Atomically write the download state."""
+
+        with self.state_lock:
+            temp_path = f"{state_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as state_file:
+                json.dump(state, state_file)
+            os.replace(temp_path, state_path)
+
+    def download_chunk(self, url, file_descriptor, start, end):
+        """Fetch bytes start to end (inclusive) and write them in place.
+        Failed requests are retried with growing delays, so a transient
+        server error does not fail the whole download."""
+
+        retries = max(
+            int(self.env.get("chunk_retries", DEFAULT_CHUNK_RETRIES)), 0
+        )
+        delay = float(
+            self.env.get("chunk_retry_delay", DEFAULT_CHUNK_RETRY_DELAY)
+        )
+        for attempt in range(retries + 1):
+            try:
+                self.fetch_range(url, file_descriptor, start, end)
+                return
+            except ProcessorError as err:
+                if attempt == retries:
+                    raise
+                self.output(
+                    f"Retrying range {start}-{end} in {delay:g} s: {err}", 1
+                )
+            sleep(delay)
+            delay *= 2
+
+    def fetch_range(self, url, file_descriptor, start, end):
+        """Fetch bytes start to end (inclusive) once and write them in
+        place."""
+
+        curl_cmd = self.base_curl_cmd()
+        curl_cmd.extend(["--range", f"{start}-{end}", url])
+
+        offset = start
+        with subprocess.Popen(
+            curl_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        ) as proc:
+            while True:
+                data = proc.stdout.read(READ_SIZE)
+                if not data:
+                    break
+                if offset + len(data) > end + 1:
+                    proc.kill()
+                    raise ProcessorError(
+                        f"Server ignored the range {start}-{end} of {url}"
+                    )
+                os.pwrite(file_descriptor, data, offset)
+                offset += len(data)
+            err = proc.stderr.read()
+
+        if proc.returncode != 0:
+            raise ProcessorError(
+                f"curl failed for range {start}-{end} of {url}: "
+                f"{err.decode('utf-8', 'replace').strip()}"
+            )
+        if offset != end + 1:
+            raise ProcessorError(
+                f"Incomplete range {start}-{end} of {url}: got "
+                f"{offset - start} bytes"
+            )
+
+    def download_single(self, url, partial_path):
+        """Download the whole file with one request and return its
+        headers."""
+
+        curl_cmd = self.base_curl_cmd()
+        curl_cmd.extend(["--dump-header", "-", "--output", partial_path, url])
+
+        return self.parse_headers(self.download_with_curl(curl_cmd))
+
+    def download_chunked(self, remote, partial_path, state, state_path):
+        """Download all missing chunks in parallel into the preallocated
+        partial file."""
+
+        chunk_size = state["chunk_size"]
+        chunks = [
+            (index, start, min(start + chunk_size, remote["size"]) - 1)
+            for index, start in enumerate(range(0, remote["size"], chunk_size))
+        ]
+        missing = [
+            chunk for chunk in chunks if chunk[0] not in state["chunks_done"]
+        ]
+
+        self.output(
+            f"Downloading {len(missing)} of {len(chunks)} chunks with "
+            f"{state['connections']} connections",
+            1,
+        )
+
+        file_descriptor = os.open(partial_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Reserve the full size up front, chunks are written in place
+            if os.fstat(file_descriptor).st_size != remote["size"]:
+                os.ftruncate(file_descriptor, remote["size"])
+
+            def fetch(chunk):
+                index, start, end = chunk
+                self.download_chunk(remote["url"], file_descriptor, start, end)
+                with self.state_lock:
+                    state["chunks_done"].append(index)
+                self.save_state(state_path, state)
+                self.output(f"Finished chunk {index} ({start}-{end})", 2)
+
+            with ThreadPoolExecutor(
+                max_workers=state["connections"]
+            ) as executor:
+                # Consume the results to re-raise errors of failed chunks
+                list(executor.map(fetch, missing))
+
+            os.fsync(file_descriptor)
+        finally:
+            os.close(file_descriptor)
+
+    def main(self):
+        url = self.env["url"]
+        download_dir = self.env.get("download_dir") or os.path.join(
+            self.env["RECIPE_CACHE_DIR"], "downloads"
+        )
+        filename = self.env.get("filename") or unquote(
+            os.path.basename(urlparse(url).path)
+        )
+        if not filename:
+            raise ProcessorError(f"Unable to derive a filename from {url}")
+
+        os.makedirs(download_dir, exist_ok=True)
+        pathname = os.path.join(download_dir, filename)
+        partial_path = f"{pathname}.partial"
+        state_path = f"{pathname}.download.json"
+
+        # clear any pre-existing summary result
+        if "url_downloader_summary_result" in self.env:
+            del self.env["url_downloader_summary_result"]
+
+        self.env["pathname"] = pathname
+        remote = self.get_remote_info(url)
+        self.env["etag"] = remote["etag"]
+        self.env["last_modified"] = remote["last_modified"]
+
+        validators = {
+            key: remote[key]
+            for key in ("url", "size", "etag", "last_modified")
+        }
+        state = self.load_state(state_path)
+
+        if (
+            state.get("complete")
+            and state.get("validators") == validators
+            and os.path.exists(pathname)
+            and os.path.getsize(pathname) == remote["size"]
+        ):
+            self.env["download_changed"] = False
+            self.output(f"Item at URL is unchanged: {pathname}")
+            return
+
+        if state.get("validators") != validators or not os.path.exists(
+            partial_path
+        ):
+            # Remote file changed or nothing to resume, start over
+            state = {
+                "validators": validators,
+                "chunk_size": int(
+                    self.env.get("chunk_size") or DEFAULT_CHUNK_SIZE
+                ),
+                "chunks_done": [],
+                "complete": False,
+            }
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        state["connections"] = max(
+            int(self.env.get("connections") or DEFAULT_CONNECTIONS), 1
+        )
+        self.save_state(state_path, state)
+
+        if remote["ranges"] and remote["size"]:
+            self.download_chunked(remote, partial_path, state, state_path)
+        else:
+            self.output("Server does not support ranges, using one request")
+            header = self.download_single(url, partial_path)
+            self.env["etag"] = remote["etag"] or header.get("etag", "")
+            self.env["last_modified"] = remote["last_modified"] or header.get(
+                "last-modified", ""
+            )
+
+        if remote["size"] and os.path.getsize(partial_path) != remote["size"]:
+            raise ProcessorError(
+                f"Downloaded {os.path.getsize(partial_path)} bytes, expected "
+                f"{remote['size']} bytes"
+            )
+
+        os.replace(partial_path, pathname)
+        state["complete"] = True
+        self.save_state(state_path, state)
+
+        self.env["download_changed"] = True
+        self.output(f"Downloaded {pathname}")
+        self.env["url_downloader_summary_result"] = {
+            "summary_text": "The following new items were downloaded:",
+            "data": {"download_path": pathname},
+        }
+
+
+if __name__ == "__main__":
+    PROCESSOR = ChunkedURLDownloader()
+    PROCESSOR.execute_shell()
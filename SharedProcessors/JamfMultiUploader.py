@@ -44,6 +44,16 @@ def get_fake_recipe():
     return fake_recipe
 
 
+def copy_env_values(values):
+    """Deep copy the values of a dictionary with one shared memo, so a value
+    referenced by several keys is copied only once and the copies stay
+    aliased"""
+
+    memo = {}
+
+    return {key: copy.deepcopy(value, memo) for key, value in values.items()}
+
+
 class JamfMultiUploader(Processor):
     """This processor invokes the given JamfUploader processor multiple times
     to support multiple Jamf environments in one AutoPkg run."""
@@ -135,12 +145,16 @@ class JamfMultiUploader(Processor):
         )
 
         if custom_config:
-            for key, value in custom_config.items():
-                if key in self.env:
-                    substituted_vars.update(
-                        {key: copy.deepcopy(self.env[key])}
-                    )
-                self.env[key] = copy.deepcopy(value)
+            substituted_vars.update(
+                copy_env_values(
+                    {
+                        key: self.env[key]
+                        for key in custom_config
+                        if key in self.env
+                    }
+                )
+            )
+            self.env.update(copy_env_values(custom_config))
 
         self.output(
             pprint.pformat({"env after temporary override": self.env}), 3
@@ -154,9 +168,16 @@ class JamfMultiUploader(Processor):
         self.output("Resetting original values", 1)
 
         if custom_config:
+            restored_vars = copy_env_values(
+                {
+                    key: substituted_vars[key]
+                    for key in custom_config
+                    if key in substituted_vars
+                }
+            )
             for key in custom_config.keys():
-                if key in substituted_vars:
-                    self.env[key] = copy.deepcopy(substituted_vars[key])
+                if key in restored_vars:
+                    self.env[key] = restored_vars[key]
                 else:
                     del self.env[key]
 
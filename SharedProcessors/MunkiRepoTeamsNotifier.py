@@ -16,240 +16,81 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import fcntl
+import hashlib
 import json
-import subprocess
-from time import sleep
+import os
+import sys
+from time import time
 
 from autopkglib import ProcessorError
 from autopkglib.URLGetter import URLGetter
 
-__all__ = ["MunkiRepoTeamsNotifier"]
-
-
-class TeamsMessage:
-    """
-    Class to create and send messages to Microsoft Teams through a webhook.
-    """
-
-    title = ""
-    subtitle = ""
-    facts = []
-    links = []
-    image_url = ""
-    set_webhook_url = ""
-    verbose_level = 1
-
-    def __init__(
-        self,
-        title="",
-        image_url="",
-        webhook_url="",
-        verbose_level=1,
-    ):
-        self.title = title
-        self.image_url = image_url
-        self.facts = []
-        self.links = []
-        self.verbose_level = verbose_level
-        self.set_webhook_url = webhook_url
-
-    def output(self, msg, verbose_level=1) -> None:
-        """Print a message if verbosity is >= verbose_level"""
-        if self.verbose_level >= verbose_level:
-            print(f"{self.__class__.__name__}: {msg}")
-
-    def set_title(self, title):
-        self.title = title
-
-    def set_subtitle(self, subtitle):
-        self.subtitle = subtitle
-
-    def add_fact(self, name, value):
-        self.facts += [{"name": name, "value": value}]
-
-    def add_link(self, link_options):
-        self.links += [
-            {
-                "url": link_options.get("url", ""),
-                "name": link_options.get("name", ""),
-                "tooltip": link_options.get("tooltip", ""),
-                "icon": link_options.get("icon", ""),
-                "mode": link_options.get("mode", ""),
-                "style": link_options.get("style", ""),
-            }
-        ]
-
-    def set_image(self, image_url):
-        self.image_url = image_url
-
-    def set_webhook(self, webhook_url):
-        self.set_webhook_url = webhook_url
-
-    def _curl_json_poster(self, message_json, teams_webhook_url):
-        """
-        Sends a JSON formatted Adaptive Card via curl through a teams webhook.
-        Essentially:
-        curl -H "Content-Type: application/json" -d "${JSON}" "${WEBHOOK_URL}"
-        """
-        curl_cmd = [
-            "/usr/bin/curl",
-            "--silent",
-            "--show-error",
-            "--fail-with-body",
-            "-H",
-            "Content-Type: application/json",
-            "-d",
-            message_json,
-            teams_webhook_url,
-        ]
-        try:
-            with subprocess.Popen(
-                curl_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-            ) as proc:
-                out, err = proc.communicate()
-        except OSError as error:
-            raise ProcessorError(error) from error
-        if proc.returncode != 0 or err:
-            self.output(
-                "curl returned an error while sending teams message"
-                "via webhook."
-            )
-            self.output(f"returncode: {proc.returncode}")
-            self.output(f"stdout: {out}")
-            self.output(f"stderr: {err}")
-            raise ProcessorError(
-                "curl returned an error while sending teams "
-                "message via webhook.",
-                f"returncode: {proc.returncode}",
-                f"stdout: {out}",
-                f"stderr: {err}",
-            )
-            # return False
-        return True
-
-    def create_content_items(self):
-        content_items = []
-        if self.title:
-            content_items += [
-                {
-                    "type": "TextBlock",
-                    "text": self.title,
-                    "wrap": True,
-                    "style": "heading",
-                }
-            ]
-
-        if self.subtitle:
-            content_items += [
-                {
-                    "type": "TextBlock",
-                    "text": self.subtitle,
-                    "wrap": True,
-                    "style": "columnHeader",
-                }
-            ]
-
-        if self.facts:
-            fact_items = []
-            for fact in self.facts:
-                fact_items += [{"title": fact["name"], "value": fact["value"]}]
-            content_items += [{"type": "FactSet", "facts": fact_items}]
-
-        if self.links:
-            action_items = []
-            for link in self.links:
-                action_items += [
-                    {
-                        "type": "Action.OpenUrl",
-                        "title": link["name"],
-                        "url": link["url"],
-                        "iconUrl": (
-                            (f"icon:{link.get('icon')}")
-                            if link.get("icon")
-                            else None
-                        ),
-                        "tooltip": link.get("tooltip"),
-                        "mode": link.get("mode", "primary"),
-                        "style": link.get("style", "default"),
-                    }
-                ]
-            content_items += [{"type": "ActionSet", "actions": action_items}]
-
-        return content_items
+# The message model and its delivery live next to this file, adding its
+# folder to sys.path violates flake8 E402, hence the noqa comments.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# pylint: disable=C0413,E0401
+from NotificationDelivery import (  # noqa: E402
+    BACKENDS,
+    DeliveryEngine,
+    Outbox,
+    RateGovernor,
+    TeamsBackend,
+    start_outbox_drainer,
+)
+from TeamsMessage import TeamsMessage, section_content_items  # noqa: E402
+
+# pylint: enable=C0413,E0401
 
-    def send(self, webhook_url=None):
-        """
-        Converts the TeamsMessage to a JSON formatted string and
-        invokes _curl_json_poster to send it to teams.
-        """
-
-        if not webhook_url and not self.set_webhook_url:
-            raise ProcessorError("No webhook url set for Teams Message.")
-
-        if webhook_url:
-            self.set_webhook(webhook_url)
+__all__ = ["MunkiRepoTeamsNotifier"]
 
-        message = {
-            "type": "AdaptiveCard",
-            "$schema": "https://adaptivecards.io/schemas/adaptive-card.json",
-            "version": "1.5",
-            "body": [],
-        }
+# Teams rejects Adaptive Cards bigger than about 28 KB, leave some headroom
+DIGEST_MAX_BYTES = 24000
 
-        content_items = self.create_content_items()
+# Icon probe results are reused for a week, missing icons are retried daily
+ICON_PROBE_TTL = 7 * 24 * 60 * 60
+ICON_PROBE_NEGATIVE_TTL = 24 * 60 * 60
 
-        if self.image_url:
-            body = [
-                {
-                    "type": "ColumnSet",
-                    "columns": [
-                        {
-                            "type": "Column",
-                            "width": "auto",
-                            "items": [
-                                {
-                                    "type": "Image",
-                                    "url": self.image_url,
-                                    "size": "Medium",
-                                }
-                            ],
-                        },
-                        {
-                            "type": "Column",
-                            "width": "stretch",
-                            "items": content_items,
-                        },
-                    ],
-                }
-            ]
-        else:
-            body = [{"type": "Container", "items": content_items}]
 
-        message["body"] = body
+def append_to_spool(spool_path, entry):
+    """
+    Appends a single message entry as JSON line to the digest spool file.
+    The file is locked, so parallel AutoPkg runs may share one spool.
+    """
+    spool_dir = os.path.dirname(spool_path)
+    if spool_dir:
+        os.makedirs(spool_dir, exist_ok=True)
 
-        message_json = json.dumps(message)
+    with open(spool_path, "a", encoding="utf-8") as spool_file:
+        fcntl.flock(spool_file, fcntl.LOCK_EX)
+        spool_file.write(json.dumps(entry) + "\n")
+        fcntl.flock(spool_file, fcntl.LOCK_UN)
 
-        self.output(
-            f"Prepared Teams message JSON: {message_json}", verbose_level=3
-        )
 
-        for count in range(1, 6):
-            self.output(f"Teams webhook post attempt {count}", verbose_level=2)
-            success = self._curl_json_poster(
-                message_json, self.set_webhook_url
-            )
-            if success:
-                break
-            sleep(10)
-        else:
-            self.output("Giving up posting to Teams:")
-            self.output("Teams webhook send did not succeed after 5 attempts")
-            raise ProcessorError(
-                "ERROR: Teams webhook failed to send 5 times."
-            )
+def drain_spool(spool_path):
+    """
+    Returns all entries of the digest spool file and empties it.
+    """
+    if not os.path.exists(spool_path):
+        return []
+
+    entries = []
+    with open(spool_path, "r+", encoding="utf-8") as spool_file:
+        fcntl.flock(spool_file, fcntl.LOCK_EX)
+        for line in spool_file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Skip partially written lines instead of losing the digest
+                continue
+        spool_file.seek(0)
+        spool_file.truncate()
+        fcntl.flock(spool_file, fcntl.LOCK_UN)
+
+    return entries
 
 
 class MunkiRepoTeamsNotifier(URLGetter):
@@ -260,8 +101,31 @@ class MunkiRepoTeamsNotifier(URLGetter):
     input_variables = {
         "NAME": {"required": False, "description": ("Generic product name.")},
         "teams_webhook_url": {
-            "required": True,
-            "description": ("Teams webhook."),
+            "required": False,
+            "description": (
+                "Teams webhook. Required unless notification_backends is set."
+            ),
+        },
+        "notification_backends": {
+            "required": False,
+            "description": (
+                "List of additional notification targets, each a dictionary "
+                "with a 'type' of teams, slack, webhook or file and the "
+                "'url' (or 'path' for file) to deliver to. All targets are "
+                "notified in parallel."
+            ),
+            "default": [],
+        },
+        "notification_outbox": {
+            "required": False,
+            "description": (
+                "Path to an outbox directory. If set, messages are stored "
+                "there and delivered by a background process, the recipe "
+                "does not wait for the webhooks. Undelivered messages are "
+                "retried by later runs or by running this processor with "
+                "'--drain-outbox <path>'. Messages the webhook refused or "
+                "that failed repeatedly are moved to its failed folder."
+            ),
         },
         "teams_username": {
             "required": False,
@@ -290,6 +154,22 @@ class MunkiRepoTeamsNotifier(URLGetter):
                 "Base url to icons folder, corresponds to Munki's IconURL"
             ),
         },
+        "MUNKI_REPO": {
+            "required": False,
+            "description": (
+                "Path to a mounted Munki repo. If its icons folder is "
+                "available, icons are looked up there instead of probing "
+                "ICON_BASE_URL via http."
+            ),
+        },
+        "MUNKI_REPO_PLUGIN": {
+            "required": False,
+            "description": (
+                "Munki repo plugin. Local icon lookup is only used with "
+                "FileRepo."
+            ),
+            "default": "FileRepo",
+        },
         "munki_repo_changed": {
             "required": False,
             "description": (
@@ -308,13 +188,296 @@ class MunkiRepoTeamsNotifier(URLGetter):
             "required": False,
             "description": ("Result of the MunkiAutoStaging processor."),
         },
+        "teams_digest_spool": {
+            "required": False,
+            "description": (
+                "Path to a spool file. If set, messages are collected in "
+                "this file instead of being sent one by one. Use "
+                "teams_digest_flush to send them as digest."
+            ),
+        },
+        "teams_digest_flush": {
+            "required": False,
+            "description": (
+                "If True, all messages collected in teams_digest_spool are "
+                "sent as digest, grouped by MunkiImporter and "
+                "MunkiAutoStaging. Set this e.g. for the last recipe of a "
+                "run."
+            ),
+            "default": False,
+        },
+        "teams_digest_max_bytes": {
+            "required": False,
+            "description": (
+                "Maximum size of a single digest message in bytes. Larger "
+                "digests are split into several messages."
+            ),
+            "default": DIGEST_MAX_BYTES,
+        },
+        "notification_state_dir": {
+            "required": False,
+            "description": (
+                "Directory for the de-duplication and rate limit state. "
+                "Defaults to MunkiRepoTeamsNotifier inside AutoPkg's "
+                "CACHE_DIR."
+            ),
+        },
+        "notification_dedup_window": {
+            "required": False,
+            "description": (
+                "Seconds in which an identical notification (same name, "
+                "versions, catalogs and targets) is not sent again, e.g. "
+                "when a failed AutoPkg run is repeated. 0 disables the "
+                "de-duplication."
+            ),
+            "default": 0,
+        },
+        "notification_rate_limit": {
+            "required": False,
+            "description": (
+                "Maximum posts per second to each webhook, shared by all "
+                "notifier processes on this host. 0 disables the limit."
+            ),
+            "default": 0,
+        },
+        "notification_rate_burst": {
+            "required": False,
+            "description": (
+                "Number of posts allowed in a burst before "
+                "notification_rate_limit applies."
+            ),
+            "default": 1,
+        },
+        "notification_retry_delay": {
+            "required": False,
+            "description": (
+                "Seconds to wait before retrying a failed webhook post. "
+                "Throttled posts wait twice as long with every attempt."
+            ),
+            "default": 10,
+        },
+        "icon_probe_cache_path": {
+            "required": False,
+            "description": (
+                "Path to a JSON file caching the results of icon url "
+                "probes. Defaults to MunkiRepoTeamsNotifier/icon_probes.json "
+                "inside AutoPkg's CACHE_DIR. Set to an empty string to "
+                "disable the cache."
+            ),
+        },
+        "icon_probe_ttl": {
+            "required": False,
+            "description": (
+                "Seconds a reachable icon url is trusted without asking the "
+                "web server again."
+            ),
+            "default": ICON_PROBE_TTL,
+        },
+        "icon_probe_negative_ttl": {
+            "required": False,
+            "description": (
+                "Seconds an unreachable icon url is remembered before it is "
+                "probed again."
+            ),
+            "default": ICON_PROBE_NEGATIVE_TTL,
+        },
     }
     output_variables = {}
 
     message = None
+    backends = None
+    icon_probe_cache = None
+    icon_probe_stats = None
+    local_icons = None
 
     __doc__ = description
 
+    def state_dir(self):
+        """
+        Returns the directory for persistent notifier state, or an empty
+        string if none is available.
+        """
+        state_dir = self.env.get("notification_state_dir")
+        if state_dir:
+            return state_dir
+
+        cache_dir = self.env.get("CACHE_DIR")
+        if not cache_dir:
+            return ""
+
+        return os.path.join(cache_dir, "MunkiRepoTeamsNotifier")
+
+    def icon_probe_cache_path(self):
+        """
+        Returns the path of the icon probe cache, or an empty string if the
+        cache is disabled.
+        """
+        cache_path = self.env.get("icon_probe_cache_path")
+        if cache_path is not None:
+            return cache_path
+
+        if not self.state_dir():
+            return ""
+
+        return os.path.join(self.state_dir(), "icon_probes.json")
+
+    def rate_governor(self):
+        """
+        Returns the RateGovernor for the configured rate limit, if any.
+        """
+        rate = float(self.env.get("notification_rate_limit") or 0)
+        if rate <= 0 or not self.state_dir():
+            return None
+
+        return RateGovernor(
+            os.path.join(self.state_dir(), "rate_limit.json"),
+            rate,
+            self.env.get("notification_rate_burst") or 1,
+        )
+
+    def notification_key(self, munki_summary, autostaging_summary):
+        """
+        Returns a hash identifying the content and targets of a
+        notification.
+        """
+        content = []
+        for summary in (munki_summary, autostaging_summary):
+            data = (summary or {}).get("data", {})
+            content.append(
+                [
+                    data.get("name"),
+                    data.get("version") or data.get("versions"),
+                    data.get("catalogs"),
+                    data.get("munki_staging_catalog"),
+                    data.get("munki_production_catalog"),
+                ]
+            )
+        content.append(sorted(backend.target for backend in self.backends))
+
+        return hashlib.sha256(
+            json.dumps(content, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def update_dedup_store(self, key, record):
+        """
+        Returns True if a notification with the given key was sent within
+        notification_dedup_window, expired keys are dropped. With
+        record=True the key is stored as sent.
+        """
+        window = float(self.env.get("notification_dedup_window") or 0)
+        if window <= 0 or not self.state_dir():
+            return False
+
+        os.makedirs(self.state_dir(), exist_ok=True)
+        dedup_path = os.path.join(self.state_dir(), "sent_notifications.json")
+        fd = os.open(dedup_path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+", encoding="utf-8") as dedup_file:
+            fcntl.flock(dedup_file, fcntl.LOCK_EX)
+            try:
+                sent = json.loads(dedup_file.read() or "{}")
+            except json.JSONDecodeError:
+                sent = {}
+
+            now = time()
+            sent = {
+                sent_key: sent_time
+                for sent_key, sent_time in sent.items()
+                if now - sent_time < window
+            }
+            duplicate = key in sent
+
+            if record:
+                sent[key] = now
+                dedup_file.seek(0)
+                dedup_file.truncate()
+                json.dump(sent, dedup_file)
+            fcntl.flock(dedup_file, fcntl.LOCK_UN)
+
+        return duplicate
+
+    def is_duplicate(self, key):
+        return self.update_dedup_store(key, record=False)
+
+    def record_notification(self, key):
+        self.update_dedup_store(key, record=True)
+
+    def load_icon_probe_cache(self):
+        """
+        Reads previous icon probe results from disk.
+        """
+        self.icon_probe_cache = {}
+        self.icon_probe_stats = {"hits": 0, "misses": 0, "revalidated": 0}
+
+        cache_path = self.icon_probe_cache_path()
+        if not cache_path or not os.path.exists(cache_path):
+            return
+
+        try:
+            with open(cache_path, encoding="utf-8") as cache_file:
+                self.icon_probe_cache = json.load(cache_file)
+        except (OSError, json.JSONDecodeError) as err:
+            self.output(f"Ignoring unreadable icon probe cache: {err}", 2)
+
+    def save_icon_probe_cache(self):
+        """
+        Writes the icon probe results to disk.
+        """
+        cache_path = self.icon_probe_cache_path()
+        if not cache_path or self.icon_probe_cache is None:
+            return
+
+        self.output(
+            "Icon probe cache: "
+            f"{self.icon_probe_stats['hits']} hits, "
+            f"{self.icon_probe_stats['misses']} misses, "
+            f"{self.icon_probe_stats['revalidated']} revalidated",
+            2,
+        )
+
+        if not self.icon_probe_stats["misses"]:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(self.icon_probe_cache, cache_file)
+            os.replace(temp_path, cache_path)
+        except OSError as err:
+            self.output(f"Could not write icon probe cache: {err}", 2)
+
+    def local_icon_names(self):
+        """
+        Returns a set with the relative paths of all files in the icons
+        folder of the local Munki repo, or None if it is not available.
+        """
+        if self.local_icons is not None:
+            return self.local_icons
+
+        munki_repo = self.env.get("MUNKI_REPO")
+        repo_plugin = self.env.get("MUNKI_REPO_PLUGIN") or "FileRepo"
+
+        if not munki_repo or repo_plugin != "FileRepo":
+            return None
+
+        icons_dir = os.path.join(munki_repo, "icons")
+        if not os.path.isdir(icons_dir):
+            self.output(f"No local icons folder at {icons_dir}", 2)
+            return None
+
+        self.local_icons = set()
+        for root, _, files in os.walk(icons_dir):
+            rel_root = os.path.relpath(root, icons_dir)
+            for file in files:
+                if rel_root == ".":
+                    self.local_icons.add(file)
+                else:
+                    self.local_icons.add(os.path.join(rel_root, file))
+
+        self.output(f"Found {len(self.local_icons)} icons in {icons_dir}", 2)
+
+        return self.local_icons
+
     def gen_icon_url(self, munki_info):
         """
         Derives the icon url from a given pkginfo dictionary
@@ -332,6 +495,13 @@ class MunkiRepoTeamsNotifier(URLGetter):
             "icon_name", f'{munki_info.get("name")}.png'
         )
 
+        local_icons = self.local_icon_names()
+        if local_icons is not None and icon_name:
+            for candidate in (icon_name, f"{icon_name}.png"):
+                if candidate in local_icons:
+                    return f"{icon_url}/{candidate}"
+            return ""
+
         if icon_name:
             icon_url = f"{icon_url}/{icon_name}"
 
@@ -347,17 +517,61 @@ class MunkiRepoTeamsNotifier(URLGetter):
 
     def check_web_url(self, url):
         """
-        Returns true if a given url seems to be valid and reachable
+        Returns true if a given url seems to be valid and reachable.
+        Results are cached, known urls are revalidated with a conditional
+        request once their TTL has passed.
         """
 
+        if self.icon_probe_cache is None:
+            self.load_icon_probe_cache()
+
+        entry = self.icon_probe_cache.get(url, {})
+
+        if entry:
+            if entry.get("reachable"):
+                ttl = int(self.env.get("icon_probe_ttl") or ICON_PROBE_TTL)
+            else:
+                ttl = int(
+                    self.env.get("icon_probe_negative_ttl")
+                    or ICON_PROBE_NEGATIVE_TTL
+                )
+            if time() - entry.get("checked", 0) < ttl:
+                self.icon_probe_stats["hits"] += 1
+                return entry.get("reachable", False)
+
+        self.icon_probe_stats["misses"] += 1
+
         curl_cmd = self.prepare_curl_cmd()
+        if entry.get("reachable"):
+            conditional_headers = {}
+            if entry.get("etag"):
+                conditional_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = entry[
+                    "last_modified"
+                ]
+            self.add_curl_headers(curl_cmd, conditional_headers)
         curl_cmd.extend(["--head", url])
         raw_headers = self.download_with_curl(curl_cmd)
         header = self.parse_headers(raw_headers)
 
         self.output(header, 2)
 
-        return header.get("http_result_code") == "200"
+        if header.get("http_result_code") == "304":
+            self.icon_probe_stats["revalidated"] += 1
+            entry["checked"] = time()
+            self.icon_probe_cache[url] = entry
+            return True
+
+        reachable = header.get("http_result_code") == "200"
+        self.icon_probe_cache[url] = {
+            "reachable": reachable,
+            "checked": time(),
+            "etag": header.get("etag", ""),
+            "last_modified": header.get("last-modified", ""),
+        }
+
+        return reachable
 
     def munki_message(self, munki_summary, munki_info, verbosity):
         """
@@ -476,6 +690,179 @@ class MunkiRepoTeamsNotifier(URLGetter):
 
         return name
 
+    def get_backends(self, teams_webhook_url):
+        """
+        Returns the configured notification backends.
+        """
+        backends = []
+        if teams_webhook_url:
+            backends.append(TeamsBackend(teams_webhook_url))
+
+        for config in self.env.get("notification_backends") or []:
+            backend_type = config.get("type", "")
+            if backend_type not in BACKENDS:
+                raise ProcessorError(
+                    f"Unknown notification backend type: {backend_type}"
+                )
+            target = config.get("path") or config.get("url")
+            if not target:
+                raise ProcessorError(
+                    f"No url or path given for {backend_type} backend."
+                )
+            backends.append(BACKENDS[backend_type](target))
+
+        if not backends:
+            raise ProcessorError(
+                "Neither teams_webhook_url nor notification_backends set."
+            )
+
+        return backends
+
+    def send_message(self, message):
+        """
+        Delivers a message to all configured backends, or queues it in the
+        outbox if one is configured.
+        """
+        outbox_path = self.env.get("notification_outbox")
+
+        governor = self.rate_governor()
+
+        if not outbox_path:
+            DeliveryEngine(
+                verbose_level=message.verbose_level,
+                retry_delay=float(
+                    self.env.get("notification_retry_delay", 10)
+                ),
+                governor=governor,
+            ).dispatch(message, self.backends)
+            return
+
+        outbox = Outbox(outbox_path, verbose_level=message.verbose_level)
+        for backend in self.backends:
+            payload = backend.render(message)
+            backend.validate(payload)
+            outbox.enqueue(backend, payload, governor)
+
+        start_outbox_drainer(outbox_path)
+        self.output(f"Queued message in outbox {outbox_path}")
+
+    def digest_messages(self, header, subtitle, entries):
+        """
+        Yields TeamsMessages combining the given spool entries, each one
+        staying below teams_digest_max_bytes. Title, image and webhook are
+        taken from the header message.
+        """
+        max_bytes = int(
+            self.env.get("teams_digest_max_bytes") or DIGEST_MAX_BYTES
+        )
+        message = None
+        size = 0
+
+        for entry in entries:
+            section = {"title": entry["title"], "facts": entry["facts"]}
+            section_size = len(json.dumps(section_content_items(section)))
+
+            if message is None or (
+                message.sections and size + section_size > max_bytes
+            ):
+                if message:
+                    message.set_subtitle(
+                        f"{subtitle} ({len(message.sections)} items)"
+                    )
+                    yield message
+                message = TeamsMessage(
+                    title=header.title,
+                    image_url=header.image_url,
+                    verbose_level=header.verbose_level,
+                )
+                size = len(message.to_json())
+
+            message.add_section(section["title"], section["facts"])
+            size += section_size + 2
+
+        if message:
+            message.set_subtitle(f"{subtitle} ({len(message.sections)} items)")
+            yield message
+
+    def flush_digest(self, spool_path, header):
+        """
+        Sends all messages collected in the spool file as digest messages,
+        grouped by their subtitle.
+        """
+        entries = drain_spool(spool_path)
+
+        if not entries:
+            self.output("Digest spool is empty, nothing to report to Teams")
+            return
+
+        self.output(f"Sending digest of {len(entries)} items to Teams")
+
+        groups = {}
+        for entry in entries:
+            groups.setdefault(entry.get("subtitle", ""), []).append(entry)
+
+        group_list = list(groups.items())
+        for index, (subtitle, group_entries) in enumerate(group_list):
+            sent = 0
+            try:
+                for message in self.digest_messages(
+                    header, subtitle, group_entries
+                ):
+                    self.send_message(message)
+                    sent += len(message.sections)
+            except ProcessorError:
+                # Keep everything not yet delivered for the next flush,
+                # including all groups not processed yet
+                undelivered = group_entries[sent:]
+                next_group = index + 1
+                for _, later_entries in group_list[next_group:]:
+                    undelivered.extend(later_entries)
+                for entry in undelivered:
+                    append_to_spool(spool_path, entry)
+                raise
+
+    def deliver_or_spool(self, notification_key, name, digest_spool):
+        """
+        Sends the message right away, or appends it to the digest spool if
+        one is configured. Messages notified about before are skipped.
+        """
+        if self.is_duplicate(notification_key):
+            # Only this message is skipped, a requested flush still runs
+            self.output(f"Skipping duplicate notification for {name}")
+            return
+
+        if digest_spool:
+            append_to_spool(
+                digest_spool,
+                {
+                    "title": self.message.title,
+                    "subtitle": self.message.subtitle,
+                    "image_url": self.message.image_url,
+                    "facts": self.message.facts,
+                },
+            )
+            self.output(f"Added message to digest spool {digest_spool}")
+        else:
+            self.send_message(self.message)
+        self.record_notification(notification_key)
+
+    def _new_message(self):
+        """
+        Returns an empty message with the configured title and icon.
+        """
+        return TeamsMessage(
+            title=self.env.get("teams_username") or "AutoPkg",
+            image_url=self.env.get("teams_icon_url", None)
+            or (
+                "https://github.com/munki/munki/blob/"
+                "c3ea21c9c754611c5d78364f05a94abc0a45adf7/code/apps/"
+                "Managed%20Software%20Center/Managed%20Software%20Center/"
+                "Assets.xcassets/AppIcon.appiconset/"
+                "MunkiStatus_128_1x.png?raw=true"
+            ),
+            verbose_level=self.env.get("verbose", 0),
+        )
+
     def main(self):
         """
         Gets environment variables of MunkiImporter and MunkiAutoStaging and
@@ -485,77 +872,64 @@ class MunkiRepoTeamsNotifier(URLGetter):
         """
         munki_info = self.env.get("munki_info", {})
         nice_name = munki_info.get("display_name", self.env.get("NAME", ""))
-        teams_webhook_url = self.env.get("teams_webhook_url")
-        teams_username = self.env.get("teams_username") or "AutoPkg"
         verbosity = int(self.env.get("verbosity")) or 0
-        teams_icon_url = self.env.get("teams_icon_url", None) or (
-            "https://github.com/munki/munki/blob/"
-            "c3ea21c9c754611c5d78364f05a94abc0a45adf7/code/apps/"
-            "Managed%20Software%20Center/Managed%20Software%20Center/"
-            "Assets.xcassets/AppIcon.appiconset/"
-            "MunkiStatus_128_1x.png?raw=true"
-        )
         munki_repo_changed = self.env.get("munki_repo_changed") or False
         munki_summary = self.env.get("munki_importer_summary_result")
         autostaging_summary = self.env.get("munki_autostaging_summary_result")
+        digest_spool = self.env.get("teams_digest_spool")
+        digest_flush = self.env.get("teams_digest_flush") or False
 
-        self.message = TeamsMessage(
-            title=teams_username,
-            image_url=teams_icon_url,
-            webhook_url=teams_webhook_url,
-            verbose_level=self.env.get("verbose", 0),
-        )
+        self.backends = self.get_backends(self.env.get("teams_webhook_url"))
+        self.message = self._new_message()
 
-        if munki_repo_changed and munki_summary and autostaging_summary:
+        if not munki_repo_changed or not (
+            munki_summary or autostaging_summary
+        ):
+            self.output("Nothing to report to Teams")
+            outbox_path = self.env.get("notification_outbox")
+            if outbox_path and Outbox(outbox_path).pending():
+                start_outbox_drainer(outbox_path)
+            if digest_spool and digest_flush:
+                self.flush_digest(digest_spool, self._new_message())
+            return
 
+        if munki_summary and autostaging_summary:
             self.message.set_subtitle("MunkiImporter and AutoStaging")
-
-            munki_name = self.munki_message(
-                munki_summary, munki_info, verbosity
-            )
-
-            staging_name = self.staging_message(
-                autostaging_summary, munki_info, verbosity
-            )
-
-            if nice_name != munki_name:
-                name = f"{nice_name} ({munki_name})"
-            else:
-                name = f"{munki_name}"
-
-        elif munki_repo_changed and munki_summary:
-
+        elif munki_summary:
             self.message.set_subtitle("MunkiImporter")
+        else:
+            self.message.set_subtitle("MunkiAutoStaging")
 
-            munki_name = self.munki_message(
+        message_name = ""
+        if munki_summary:
+            message_name = self.munki_message(
                 munki_summary, munki_info, verbosity
             )
-
-            if nice_name != munki_name:
-                name = f"{nice_name} ({munki_name})"
-            else:
-                name = f"{munki_name}"
-
-        elif munki_repo_changed and autostaging_summary:
-
-            self.message.set_subtitle("MunkiAutoStaging")
-
+        if autostaging_summary:
             staging_name = self.staging_message(
                 autostaging_summary, munki_info, verbosity
             )
+            if not munki_summary:
+                message_name = staging_name
 
-            if nice_name != staging_name:
-                name = f"{nice_name} ({staging_name})"
-            else:
-                name = f"{staging_name}"
-        else:
-            self.output("Nothing to report to Teams")
-            return
-
+        name = (
+            f"{message_name}"
+            if nice_name == message_name
+            else f"{nice_name} ({message_name})"
+        )
         if name:
             self.message.set_title(name)
 
-        self.message.send()
+        self.save_icon_probe_cache()
+
+        self.deliver_or_spool(
+            self.notification_key(munki_summary, autostaging_summary),
+            name,
+            digest_spool,
+        )
+
+        if digest_spool and digest_flush:
+            self.flush_digest(digest_spool, self._new_message())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,622 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Notification backends and their delivery for MunkiRepoTeamsNotifier: rate
+limiting, retries and the outbox drained by a detached process.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import sleep, time
+
+# pylint: disable=E0401
+from autopkglib import ProcessorError
+
+__all__ = [
+    "BACKENDS",
+    "DeliveryEngine",
+    "NotificationBackend",
+    "Outbox",
+    "RateGovernor",
+    "TeamsBackend",
+    "WebhookError",
+    "start_outbox_drainer",
+]
+
+# Teams rejects webhook payloads larger than 28 KB
+TEAMS_MAX_PAYLOAD_BYTES = 28 * 1024
+
+# Delivered message ids are remembered for 30 days to suppress duplicates
+OUTBOX_SENT_RETENTION = 30 * 24 * 60 * 60
+
+# Outbox messages failing in this many drains are moved to the failed folder
+OUTBOX_MAX_ATTEMPTS = 10
+
+
+class WebhookError(ProcessorError):
+    """
+    Raised if posting to a webhook failed, keeps the HTTP status code.
+    """
+
+    def __init__(self, *args, status_code=0):
+        super().__init__(*args)
+        self.status_code = status_code
+
+    @property
+    def permanent(self):
+        """
+        True if the webhook refused the message, so retrying is pointless.
+        """
+        return 400 <= self.status_code < 500 and self.status_code != 429
+
+
+class NotificationBackend:
+    """
+    Base class for notification backends. A backend renders the message
+    model into its own format and delivers it to its target.
+    """
+
+    name = "generic"
+
+    def __init__(self, target):
+        self.target = target
+
+    def render(self, message):
+        return json.dumps(message.to_dict())
+
+    def validate(self, payload):
+        """
+        Raises a ProcessorError if the target would refuse the payload.
+        """
+
+    def deliver(self, engine, payload):
+        engine.post_json(payload, self.target)
+
+
+class TeamsBackend(NotificationBackend):
+    """
+    Posts messages as Adaptive Cards to a Microsoft Teams webhook.
+    """
+
+    name = "teams"
+
+    def render(self, message):
+        return message.to_json()
+
+    def validate(self, payload):
+        size = len(payload.encode("utf-8"))
+        if size > TEAMS_MAX_PAYLOAD_BYTES:
+            raise ProcessorError(
+                f"Teams message has {size} bytes, the webhook accepts at "
+                f"most {TEAMS_MAX_PAYLOAD_BYTES} bytes."
+            )
+
+        card = json.loads(payload)
+        if card.get("type") != "AdaptiveCard" or not isinstance(
+            card.get("body"), list
+        ):
+            raise ProcessorError("Teams message is no valid Adaptive Card.")
+
+
+class SlackBackend(NotificationBackend):
+    """
+    Posts messages with Block Kit layout to a Slack incoming webhook.
+    """
+
+    name = "slack"
+
+    def render(self, message):
+        fields = [
+            {"type": "mrkdwn", "text": f"*{fact['name']}*\n{fact['value']}"}
+            for fact in message.facts
+        ]
+
+        header = {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": f"*{message.title}*"},
+        }
+        if message.image_url:
+            header["accessory"] = {
+                "type": "image",
+                "image_url": message.image_url,
+                "alt_text": message.title,
+            }
+        blocks = [header]
+
+        if message.subtitle:
+            blocks += [
+                {
+                    "type": "context",
+                    "elements": [{"type": "mrkdwn", "text": message.subtitle}],
+                }
+            ]
+
+        # Slack allows 10 fields per section
+        while fields:
+            blocks += [{"type": "section", "fields": fields[:10]}]
+            fields = fields[10:]
+
+        for section in message.sections:
+            lines = [f"*{section['title']}*"] + [
+                f"{fact['name']}: {fact['value']}" for fact in section["facts"]
+            ]
+            blocks += [
+                {
+                    "type": "section",
+                    "text": {"type": "mrkdwn", "text": "\n".join(lines)},
+                }
+            ]
+
+        if message.links:
+            blocks += [
+                {
+                    "type": "actions",
+                    "elements": [
+                        {
+                            "type": "button",
+                            "text": {
+                                "type": "plain_text",
+                                "text": link["name"],
+                            },
+                            "url": link["url"],
+                        }
+                        for link in message.links
+                    ],
+                }
+            ]
+
+        return json.dumps({"text": message.title, "blocks": blocks})
+
+
+class JSONWebhookBackend(NotificationBackend):
+    """
+    Posts the plain message model as JSON to a generic webhook.
+    """
+
+    name = "webhook"
+
+
+class FileBackend(NotificationBackend):
+    """
+    Appends the plain message model as JSON line to a local file, useful
+    for auditing and testing.
+    """
+
+    name = "file"
+
+    def deliver(self, engine, payload):
+        target_dir = os.path.dirname(self.target)
+        if target_dir:
+            os.makedirs(target_dir, exist_ok=True)
+
+        with open(self.target, "a", encoding="utf-8") as target_file:
+            fcntl.flock(target_file, fcntl.LOCK_EX)
+            target_file.write(payload + "\n")
+            fcntl.flock(target_file, fcntl.LOCK_UN)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (
+        TeamsBackend,
+        SlackBackend,
+        JSONWebhookBackend,
+        FileBackend,
+    )
+}
+
+
+class RateGovernor:
+    """
+    Token bucket limiting the posts per second to a webhook. The bucket
+    state is kept in a locked file, so all notifier processes on a host
+    share the same budget.
+    """
+
+    def __init__(self, state_path, rate, burst=1):
+        self.state_path = state_path
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+
+    def config(self):
+        return {
+            "state_path": self.state_path,
+            "rate": self.rate,
+            "burst": self.burst,
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        if not config:
+            return None
+        return cls(config["state_path"], config["rate"], config["burst"])
+
+    def acquire(self, webhook_url):
+        """
+        Blocks until a token for the given webhook is available.
+        """
+        key = hashlib.sha256(webhook_url.encode("utf-8")).hexdigest()
+        state_dir = os.path.dirname(self.state_path)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+        while True:
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, "r+", encoding="utf-8") as state_file:
+                fcntl.flock(state_file, fcntl.LOCK_EX)
+                try:
+                    state = json.loads(state_file.read() or "{}")
+                except json.JSONDecodeError:
+                    state = {}
+
+                now = time()
+                bucket = state.get(key, {"tokens": self.burst, "updated": now})
+                tokens = min(
+                    self.burst,
+                    bucket["tokens"] + (now - bucket["updated"]) * self.rate,
+                )
+
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                state[key] = {"tokens": tokens, "updated": now}
+                state_file.seek(0)
+                state_file.truncate()
+                json.dump(state, state_file)
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+            if not wait:
+                return
+            sleep(wait)
+
+
+class DeliveryEngine:
+    """
+    Delivers a message to several backends concurrently, so a slow or
+    unreachable backend does not hold back the others.
+    """
+
+    def __init__(
+        self, verbose_level=1, attempts=5, retry_delay=10, governor=None
+    ):
+        self.verbose_level = verbose_level
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.governor = governor
+
+    def output(self, msg, verbose_level=1) -> None:
+        """Print a message if verbosity is >= verbose_level"""
+        if self.verbose_level >= verbose_level:
+            print(f"{self.__class__.__name__}: {msg}")
+
+    def _curl_json_poster(self, message_json, webhook_url):
+        """
+        Sends a JSON formatted message via curl through a webhook.
+        Essentially:
+        curl -H "Content-Type: application/json" -d "${JSON}" "${WEBHOOK_URL}"
+        """
+        curl_cmd = [
+            "/usr/bin/curl",
+            "--silent",
+            "--show-error",
+            "--fail-with-body",
+            "-H",
+            "Content-Type: application/json",
+            "-d",
+            message_json,
+            "--write-out",
+            "\n%{http_code}",
+            webhook_url,
+        ]
+        try:
+            with subprocess.Popen(
+                curl_cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+            ) as proc:
+                out, err = proc.communicate()
+        except OSError as error:
+            raise WebhookError(error) from error
+        out, _, status = out.rpartition("\n")
+        status_code = int(status) if status.isdigit() else 0
+        if proc.returncode != 0 or err:
+            self.output(
+                "curl returned an error while sending message via webhook."
+            )
+            self.output(f"returncode: {proc.returncode}")
+            self.output(f"http status: {status_code}")
+            self.output(f"stdout: {out}")
+            self.output(f"stderr: {err}")
+            raise WebhookError(
+                "curl returned an error while sending message via webhook.",
+                f"returncode: {proc.returncode}",
+                f"http status: {status_code}",
+                f"stdout: {out}",
+                f"stderr: {err}",
+                status_code=status_code,
+            )
+        return True
+
+    def post_json(self, message_json, webhook_url):
+        """
+        Posts a JSON string to a webhook, retrying on errors.
+        """
+        for count in range(1, self.attempts + 1):
+            self.output(f"Webhook post attempt {count}", verbose_level=2)
+            if self.governor:
+                self.governor.acquire(webhook_url)
+            try:
+                self._curl_json_poster(message_json, webhook_url)
+                return
+            except WebhookError as err:
+                if err.permanent:
+                    self.output(
+                        f"Webhook refused the message with HTTP "
+                        f"{err.status_code}, not retrying."
+                    )
+                    raise
+                if count == self.attempts:
+                    break
+                if err.status_code == 429:
+                    # Throttled, back off further with every attempt
+                    sleep(self.retry_delay * 2 ** (count - 1))
+                else:
+                    sleep(self.retry_delay)
+
+        self.output("Giving up posting to webhook:")
+        self.output(
+            f"Webhook send did not succeed after {self.attempts} attempts"
+        )
+        raise ProcessorError(
+            f"ERROR: Webhook failed to send {self.attempts} times."
+        )
+
+    def dispatch(self, message, backends):
+        """
+        Renders the message once per backend and delivers all payloads in
+        parallel. Raises a ProcessorError after all deliveries finished if
+        any of them failed.
+        """
+        payloads = []
+        for backend in backends:
+            payload = backend.render(message)
+            backend.validate(payload)
+            self.output(
+                f"Prepared {backend.name} message: {payload}", verbose_level=3
+            )
+            payloads.append((backend, payload))
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=len(payloads) or 1) as executor:
+            futures = {
+                executor.submit(backend.deliver, self, payload): backend
+                for backend, payload in payloads
+            }
+            for future in as_completed(futures):
+                backend = futures[future]
+                try:
+                    future.result()
+                except (OSError, ProcessorError) as err:
+                    errors.append(f"{backend.name}: {err}")
+
+        if errors:
+            raise ProcessorError(
+                "Delivery failed for backends: " + "; ".join(errors)
+            )
+
+
+class Outbox:
+    """
+    Durable local queue of rendered messages. Messages are written to disk
+    first and delivered later by drain(), which may run in a detached
+    process or as standalone replay command. Every message gets an id
+    derived from its backend, target and payload, already delivered ids
+    are not sent again. Messages the webhook refused or that failed
+    OUTBOX_MAX_ATTEMPTS times are moved to the failed folder.
+    """
+
+    def __init__(self, path, verbose_level=1):
+        self.path = path
+        self.pending_dir = os.path.join(path, "pending")
+        self.sent_dir = os.path.join(path, "sent")
+        self.failed_dir = os.path.join(path, "failed")
+        self.verbose_level = verbose_level
+        os.makedirs(self.pending_dir, exist_ok=True)
+        os.makedirs(self.sent_dir, exist_ok=True)
+        os.makedirs(self.failed_dir, exist_ok=True)
+
+    def output(self, msg, verbose_level=1) -> None:
+        """Print a message if verbosity is >= verbose_level"""
+        if self.verbose_level >= verbose_level:
+            print(f"{self.__class__.__name__}: {msg}")
+
+    @staticmethod
+    def message_id(backend, payload):
+        digest = hashlib.sha256()
+        for part in (backend.name, backend.target, payload):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def enqueue(self, backend, payload, governor=None):
+        """
+        Stores a rendered message. Returns False if the same message is
+        already pending or was delivered before.
+        """
+        message_id = self.message_id(backend, payload)
+        pending_path = os.path.join(self.pending_dir, f"{message_id}.json")
+
+        if os.path.exists(pending_path) or os.path.exists(
+            os.path.join(self.sent_dir, message_id)
+        ):
+            self.output(f"Skipping duplicate message {message_id}", 2)
+            return False
+
+        temp_path = f"{pending_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as pending_file:
+            json.dump(
+                {
+                    "id": message_id,
+                    "backend": backend.name,
+                    "target": backend.target,
+                    "payload": payload,
+                    "created": time(),
+                    "attempts": 0,
+                    "governor": governor.config() if governor else None,
+                },
+                pending_file,
+            )
+        os.replace(temp_path, pending_path)
+        self.output(f"Queued {backend.name} message {message_id}", 2)
+
+        return True
+
+    def pending(self):
+        """
+        Returns the paths of all pending messages, oldest first.
+        """
+        paths = [
+            os.path.join(self.pending_dir, name)
+            for name in os.listdir(self.pending_dir)
+            if name.endswith(".json")
+        ]
+        return sorted(paths, key=os.path.getmtime)
+
+    def drain(self, engine):
+        """
+        Delivers all pending messages. Only one drainer works on an outbox
+        at a time, others return immediately. Returns the number of
+        delivered and failed messages.
+        """
+        delivered = failed = 0
+
+        with open(
+            os.path.join(self.path, ".lock"), "w", encoding="utf-8"
+        ) as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.output("Outbox is already being drained", 2)
+                return delivered, failed
+
+            for pending_path in self.pending():
+                try:
+                    with open(pending_path, encoding="utf-8") as pending_file:
+                        entry = json.load(pending_file)
+                except (OSError, json.JSONDecodeError) as err:
+                    self.output(f"Skipping unreadable {pending_path}: {err}")
+                    continue
+
+                backend = BACKENDS[entry["backend"]](entry["target"])
+                engine.governor = RateGovernor.from_config(
+                    entry.get("governor")
+                )
+                try:
+                    backend.deliver(engine, entry["payload"])
+                except (OSError, ProcessorError) as err:
+                    failed += 1
+                    entry["attempts"] += 1
+                    entry["error"] = str(err)
+                    self.output(
+                        f"Delivery of {entry['id']} failed "
+                        f"({entry['attempts']} attempts): {err}"
+                    )
+                    with open(
+                        pending_path, "w", encoding="utf-8"
+                    ) as pending_file:
+                        json.dump(entry, pending_file)
+                    if (
+                        isinstance(err, WebhookError) and err.permanent
+                    ) or entry["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+                        self.output(
+                            f"Giving up on {entry['id']}, moved to "
+                            f"{self.failed_dir}"
+                        )
+                        os.replace(
+                            pending_path,
+                            os.path.join(
+                                self.failed_dir, os.path.basename(pending_path)
+                            ),
+                        )
+                    continue
+
+                delivered += 1
+                with open(
+                    os.path.join(self.sent_dir, entry["id"]),
+                    "w",
+                    encoding="utf-8",
+                ):
+                    pass
+                os.remove(pending_path)
+
+            self.prune_sent()
+
+        self.output(f"Delivered {delivered} messages, {failed} failed")
+
+        return delivered, failed
+
+    def prune_sent(self):
+        """
+        Forgets delivered message ids older than OUTBOX_SENT_RETENTION.
+        """
+        expired = time() - OUTBOX_SENT_RETENTION
+        for name in os.listdir(self.sent_dir):
+            sent_path = os.path.join(self.sent_dir, name)
+            if os.path.getmtime(sent_path) < expired:
+                os.remove(sent_path)
+
+
+def start_outbox_drainer(outbox_path):
+    """
+    Starts a detached process delivering the outbox, so the recipe does
+    not wait for slow or unreachable webhooks.
+    """
+    env = dict(os.environ)
+    # The drainer needs to import autopkglib just like the processor
+    autopkglib_dir = os.path.dirname(
+        os.path.dirname(sys.modules["autopkglib"].__file__)
+    )
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [autopkglib_dir, env.get("PYTHONPATH")])
+    )
+    # pylint: disable=R1732
+    subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--drain-outbox",
+            outbox_path,
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        start_new_session=True,
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--drain-outbox":
+        Outbox(sys.argv[2]).drain(DeliveryEngine())
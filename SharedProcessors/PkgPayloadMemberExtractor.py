@@ -0,0 +1,507 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""See docstring for PkgPayloadMemberExtractor class"""
+
+import fnmatch
+import hashlib
+import json
+import lzma
+import os
+import re
+import shutil
+import struct
+import zlib
+from xml.etree import ElementTree
+
+# pylint: disable=E0401
+from autopkglib import Processor, ProcessorError
+
+__all__ = ["PkgPayloadMemberExtractor"]
+
+READ_SIZE = 1024 * 1024
+
+XAR_HEADER = struct.Struct(">4sHHQQI")
+PBZX_CHUNK_HEADER = struct.Struct(">QQ")
+XZ_MAGIC = b"\xfd7zXZ\x00"
+GZIP_MAGIC = b"\x1f\x8b"
+CPIO_ODC_MAGIC = b"070707"
+CPIO_ODC_HEADER_SIZE = 76
+CPIO_TRAILER = "TRAILER!!!"
+
+S_IFMT = 0o170000
+S_IFREG = 0o100000
+S_IFLNK = 0o120000
+
+# Cache entries are named by the hex sha256 of their key, anything else in
+# cache_dir is left alone
+CACHE_KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class ChunkReader:
+    """Read and skip bytes of a stream given as iterator of byte chunks,
+    keeping only the current chunk in memory."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = b""
+        self.offset = 0
+
+    def read(self, size):
+        """Return up to size bytes, less only at the end of the stream."""
+        while len(self.buffer) - self.offset < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            start = self.offset
+            self.buffer = self.buffer[start:] + chunk
+            self.offset = 0
+
+        start = self.offset
+        end = min(start + size, len(self.buffer))
+        self.offset = end
+        return self.buffer[start:end]
+
+    def remainder(self):
+        """Return the buffered bytes not read yet."""
+        start = self.offset
+        return self.buffer[start:]
+
+    def skip(self, size):
+        """Discard size bytes."""
+        available = len(self.buffer) - self.offset
+        while size > available:
+            size -= available
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                raise ProcessorError("Unexpected end of the pkg payload")
+            self.buffer = chunk
+            self.offset = 0
+            available = len(chunk)
+        self.offset += size
+
+
+def read_file_range(file_path, offset, length):
+    """Yield length bytes of a file starting at offset."""
+    with open(file_path, "rb") as file_handle:
+        file_handle.seek(offset)
+        while length > 0:
+            data = file_handle.read(min(READ_SIZE, length))
+            if not data:
+                raise ProcessorError(f"Unexpected end of {file_path}")
+            length -= len(data)
+            yield data
+
+
+def inflate_chunks(chunks, wbits=zlib.MAX_WBITS):
+    """Yield the decompressed data of zlib or, with wbits for gzip, of one
+    or more concatenated gzip members."""
+    decompressor = zlib.decompressobj(wbits)
+    for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+            if not decompressor.eof:
+                break
+            # Start over with the next concatenated member
+            chunk = decompressor.unused_data
+            decompressor = zlib.decompressobj(wbits)
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def pbzx_chunks(reader):
+    """Yield the decompressed chunks of a pbzx stream after its magic."""
+    reader.read(8)  # flags
+    while True:
+        header = reader.read(PBZX_CHUNK_HEADER.size)
+        if len(header) < PBZX_CHUNK_HEADER.size:
+            return
+        _flags, length = PBZX_CHUNK_HEADER.unpack(header)
+        data = reader.read(length)
+        if len(data) != length:
+            raise ProcessorError("Truncated pbzx chunk in the pkg payload")
+        # Chunks are xz streams, except those that did not compress
+        if data.startswith(XZ_MAGIC):
+            data = lzma.decompress(data, format=lzma.FORMAT_XZ)
+        yield data
+
+
+def _prepend(first, chunks):
+    """Yield first, then all chunks."""
+    yield first
+    yield from chunks
+
+
+def payload_chunks(chunks):
+    """Yield the cpio archive of a gzip or pbzx compressed payload."""
+    reader = ChunkReader(chunks)
+    magic = reader.read(4)
+
+    if magic.startswith(GZIP_MAGIC):
+        yield from inflate_chunks(
+            _prepend(magic + reader.remainder(), reader.chunks),
+            zlib.MAX_WBITS | 16,
+        )
+    elif magic == b"pbzx":
+        yield from pbzx_chunks(reader)
+    elif magic == CPIO_ODC_MAGIC[:4]:
+        yield from _prepend(magic + reader.remainder(), reader.chunks)
+    else:
+        raise ProcessorError(f"Unsupported pkg payload format: {magic!r}")
+
+
+def parse_xar_toc(pkg_path):
+    """Return the heap offset, the raw TOC digest and the TOC of a xar
+    archive."""
+    with open(pkg_path, "rb") as pkg_file:
+        header = pkg_file.read(XAR_HEADER.size)
+        if len(header) < XAR_HEADER.size:
+            raise ProcessorError(f"{pkg_path} is not a flat package")
+        magic, header_size, _version, toc_size, _toc_uncompressed, _alg = (
+            XAR_HEADER.unpack(header)
+        )
+        if magic != b"xar!":
+            raise ProcessorError(f"{pkg_path} is not a flat package")
+
+        pkg_file.seek(header_size)
+        compressed_toc = pkg_file.read(toc_size)
+
+    try:
+        toc = ElementTree.fromstring(zlib.decompress(compressed_toc))
+    except (zlib.error, ElementTree.ParseError) as err:
+        raise ProcessorError(
+            f"Unable to read the table of contents of {pkg_path}: {err}"
+        ) from err
+
+    # The TOC holds the checksums of all files, its digest identifies the
+    # whole package
+    digest = hashlib.sha256(compressed_toc).hexdigest()
+
+    return header_size + toc_size, digest, toc
+
+
+def find_payload(toc, component_pattern):
+    """Return the data element of the Payload of the first component
+    package matching the pattern, and the component name."""
+    components = []
+    for file_element in toc.iter("file"):
+        name = file_element.findtext("name", "")
+        for child in file_element.findall("file"):
+            if child.findtext("name") == "Payload":
+                components.append((name, child.find("data")))
+
+    for name, data in sorted(components, key=lambda item: item[0]):
+        if fnmatch.fnmatch(name, component_pattern or "*"):
+            return name, data
+
+    raise ProcessorError(
+        f"No component package matching '{component_pattern}' with a "
+        f"payload, found: {', '.join(name for name, _ in components)}"
+    )
+
+
+class PkgPayloadMemberExtractor(Processor):
+    """Extracts single files from the payload of a flat package without
+    unpacking anything else. The xar archive, its gzip or pbzx compressed
+    payload and the cpio archive within are read as a stream, reading stops
+    as soon as all members were found. Results are cached by a digest of
+    the package's table of contents, so an unchanged package is not read
+    again."""
+
+    description = __doc__
+    input_variables = {
+        "pkg_path": {
+            "required": True,
+            "description": "Path to the flat package.",
+        },
+        "component_pattern": {
+            "required": False,
+            "description": (
+                "Shell pattern matching the name of the component package "
+                "inside pkg_path, e.g. '*Word*.pkg'. Defaults to the first "
+                "component with a payload, or the package itself if it is "
+                "a component package."
+            ),
+        },
+        "members": {
+            "required": True,
+            "description": (
+                "List of paths relative to the payload root to extract, "
+                "e.g. 'Microsoft Word.app/Contents/Info.plist'. A path "
+                "ending in a slash extracts everything below it."
+            ),
+        },
+        "destination_path": {
+            "required": True,
+            "description": "Directory to extract the members to.",
+        },
+        "cache_dir": {
+            "required": False,
+            "description": (
+                "Directory caching extracted members. Defaults to "
+                "RECIPE_CACHE_DIR/PkgPayloadMemberExtractor, an empty "
+                "string disables the cache."
+            ),
+        },
+    }
+    output_variables = {
+        "extracted_members": {
+            "description": "List of paths of the extracted members."
+        },
+        "pkg_digest": {
+            "description": "Digest of the package's table of contents."
+        },
+        "payload_cache_status": {
+            "description": "hit, miss or disabled.",
+        },
+    }
+
+    def get_cache_dir(self):
+        """Return the cache directory, empty if the cache is disabled."""
+        cache_dir = self.env.get("cache_dir")
+        if cache_dir is not None:
+            return cache_dir
+
+        if not self.env.get("RECIPE_CACHE_DIR"):
+            return ""
+
+        return os.path.join(
+            self.env["RECIPE_CACHE_DIR"], "PkgPayloadMemberExtractor"
+        )
+
+    def is_wanted(self, name, members):
+        """Return True if a payload path is one of or below the members."""
+        return any(
+            name == member
+            or (member.endswith("/") and name.startswith(member))
+            for member in members
+        )
+
+    def write_member(self, reader, destination, name, mode, size):
+        """Write a cpio entry of the reader to the destination."""
+        target = os.path.join(destination, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        if mode & S_IFMT == S_IFLNK:
+            link = reader.read(size).decode("utf-8")
+            if os.path.lexists(target):
+                os.remove(target)
+            os.symlink(link, target)
+            return target
+
+        with open(target, "wb") as target_file:
+            while size > 0:
+                data = reader.read(min(size, READ_SIZE))
+                if not data:
+                    raise ProcessorError(f"Truncated member {name}")
+                target_file.write(data)
+                size -= len(data)
+        os.chmod(target, mode & 0o777 or 0o644)
+
+        return target
+
+    def extract_members(self, cpio_chunks, members, destination):
+        """Extract the members of an odc cpio stream, return the paths
+        of the written files relative to the destination."""
+        reader = ChunkReader(cpio_chunks)
+        exact_members = {
+            member for member in members if not member.endswith("/")
+        }
+        # Everything below a directory member has to be read to the end
+        stop_early = len(exact_members) == len(members)
+        extracted = []
+
+        while True:
+            header = reader.read(CPIO_ODC_HEADER_SIZE)
+            if len(header) < CPIO_ODC_HEADER_SIZE:
+                raise ProcessorError("Unexpected end of the cpio archive")
+            if not header.startswith(CPIO_ODC_MAGIC):
+                raise ProcessorError(
+                    f"Unsupported cpio format in the pkg payload: "
+                    f"{header[:6]!r}"
+                )
+
+            mode = int(header[18:24], 8)
+            name_size = int(header[59:65], 8)
+            file_size = int(header[65:76], 8)
+            name = reader.read(name_size).rstrip(b"\0").decode("utf-8")
+            if name == CPIO_TRAILER:
+                break
+
+            name = name[2:] if name.startswith("./") else name.lstrip("/")
+            if mode & S_IFMT in (S_IFREG, S_IFLNK) and self.is_wanted(
+                name, members
+            ):
+                self.write_member(reader, destination, name, mode, file_size)
+                extracted.append(name)
+                self.output(f"Extracted {name}", 2)
+                exact_members.discard(name)
+                if stop_early and not exact_members:
+                    break
+            else:
+                reader.skip(file_size)
+
+        missing = [
+            member
+            for member in members
+            if not any(self.is_wanted(name, [member]) for name in extracted)
+        ]
+        if missing:
+            raise ProcessorError(
+                f"Members not found in the pkg payload: {', '.join(missing)}"
+            )
+
+        return extracted
+
+    def main(self):
+        pkg_path = self.env["pkg_path"]
+        destination = self.env["destination_path"]
+        component_pattern = self.env.get("component_pattern") or ""
+        members = self.env["members"]
+        if isinstance(members, str):
+            members = [members]
+        members = [
+            member[2:] if member.startswith("./") else member.lstrip("/")
+            for member in members
+            if member
+        ]
+        if not members:
+            raise ProcessorError("No members to extract given.")
+
+        heap_offset, digest, toc = parse_xar_toc(pkg_path)
+        self.env["pkg_digest"] = digest
+
+        cache_dir = self.get_cache_dir()
+        cache_key = hashlib.sha256(
+            "\0".join([digest, component_pattern] + members).encode("utf-8")
+        ).hexdigest()
+        cached_path = os.path.join(cache_dir, cache_key) if cache_dir else ""
+        record_path = os.path.join(cached_path, "members.json")
+
+        if cached_path and os.path.exists(record_path):
+            with open(record_path, encoding="utf-8") as record_file:
+                extracted = json.load(record_file)
+            self.env["payload_cache_status"] = "hit"
+        else:
+            extracted = self._extract_payload(
+                heap_offset, toc, members, destination, cached_path
+            )
+            self.env["payload_cache_status"] = (
+                "miss" if cached_path else "disabled"
+            )
+
+        if cached_path:
+            self._copy_from_cache(cached_path, extracted, destination)
+
+        self.env["extracted_members"] = [
+            os.path.join(destination, name) for name in extracted
+        ]
+        self.output(
+            f"{len(extracted)} members of {pkg_path} at {destination} "
+            f"(cache: {self.env['payload_cache_status']})"
+        )
+
+    def _extract_payload(
+        self, heap_offset, toc, members, destination, cached_path
+    ):
+        """Read the payload and extract the members, into the cache if
+        cached_path is set and directly to the destination otherwise."""
+        pkg_path = self.env["pkg_path"]
+        component, data = self._find_component(
+            toc, self.env.get("component_pattern") or ""
+        )
+        self.output(f"Reading the payload of {component}")
+        chunks = read_file_range(
+            pkg_path,
+            heap_offset + int(data.findtext("offset")),
+            int(data.findtext("length")),
+        )
+        encoding = data.find("encoding")
+        if (
+            encoding is not None
+            and encoding.get("style") == "application/x-gzip"
+        ):
+            chunks = inflate_chunks(chunks)
+
+        temp_path = f"{cached_path}.{os.getpid()}.tmp"
+        try:
+            extracted = self.extract_members(
+                payload_chunks(chunks),
+                members,
+                temp_path if cached_path else destination,
+            )
+            if cached_path:
+                self._store_in_cache(temp_path, cached_path, extracted)
+        except (lzma.LZMAError, zlib.error, ValueError) as err:
+            raise ProcessorError(
+                f"Unable to read the payload of {pkg_path}: {err}"
+            ) from err
+        finally:
+            if cached_path:
+                shutil.rmtree(temp_path, ignore_errors=True)
+
+        return extracted
+
+    def _store_in_cache(self, temp_path, cached_path, extracted):
+        """Move freshly extracted members into the cache, replacing the
+        members of previous packages. Only entries named like a cache key
+        are removed, cache_dir may be shared with other files."""
+        with open(
+            os.path.join(temp_path, "members.json"), "w", encoding="utf-8"
+        ) as record_file:
+            json.dump(extracted, record_file)
+
+        shutil.rmtree(cached_path, ignore_errors=True)
+        os.replace(temp_path, cached_path)
+
+        cache_dir = os.path.dirname(cached_path)
+        for entry in os.listdir(cache_dir):
+            entry_path = os.path.join(cache_dir, entry)
+            if (
+                entry != os.path.basename(cached_path)
+                and CACHE_KEY_PATTERN.fullmatch(entry)
+                and os.path.isdir(entry_path)
+            ):
+                shutil.rmtree(entry_path, ignore_errors=True)
+
+    def _copy_from_cache(self, cached_path, extracted, destination):
+        """Copy cached members to the destination, keeping symlinks."""
+        for name in extracted:
+            target = os.path.join(destination, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.lexists(target):
+                os.remove(target)
+            shutil.copy2(
+                os.path.join(cached_path, name),
+                target,
+                follow_symlinks=False,
+            )
+
+    def _find_component(self, toc, component_pattern):
+        """Return name and data element of the payload to read, which is
+        the package's own payload for a component package."""
+        for file_element in toc.find("toc").findall("file"):
+            if file_element.findtext("name") == "Payload":
+                return "Payload", file_element.find("data")
+
+        return find_payload(toc, component_pattern)
+
+
+if __name__ == "__main__":
+    PROCESSOR = PkgPayloadMemberExtractor()
+    PROCESSOR.execute_shell()
@@ -1,32 +1,89 @@
 #!/usr/local/autopkg/python
 """AutoPkg processor for renaming variables."""
 
-from autopkglib import Processor
+from autopkglib import Processor, ProcessorError
 
 __all__ = ["RenameVar"]
 
 
 class RenameVar(Processor):
-    """Substitute a character from a given string
-    and return the parsed string"""
+    """Copy the value of input_var to the variable named rename_var, or copy
+    several variables at once as given in var_mapping."""
 
     input_variables = {
         "input_var": {
-            "required": True,
+            "required": False,
             "description": "string",
         },
         "rename_var": {
-            "required": True,
+            "required": False,
             "description": "string",
         },
+        "var_mapping": {
+            "required": False,
+            "description": (
+                "Dictionary mapping source variable names to target "
+                "variable names, e.g. {'pathname': 'pathname_app'}. Target "
+                "names may use %var% substitution. All sources are read "
+                "before any target is written, so variables can also be "
+                "swapped."
+            ),
+        },
+        "move": {
+            "required": False,
+            "description": (
+                "If True, the source variables of var_mapping are removed "
+                "unless they are also a target."
+            ),
+            "default": False,
+        },
     }
 
     output_variables = {}
 
     description = __doc__
 
+    def rename_vars(self, var_mapping, move=False):
+        """Copy the values of the source variables of var_mapping to their
+        targets, reading all sources before writing any target."""
+
+        missing = [source for source in var_mapping if source not in self.env]
+        if missing:
+            raise ProcessorError(
+                f"Unknown variables in var_mapping: {', '.join(missing)}"
+            )
+
+        values = {
+            target: self.env[source] for source, target in var_mapping.items()
+        }
+        self.env.update(values)
+
+        if move:
+            for source in var_mapping:
+                if source not in values:
+                    del self.env[source]
+
+        for source, target in var_mapping.items():
+            self.output(f"{source} -> {target}", 2)
+
     def main(self):
-        self.env[self.env["rename_var"]] = self.env["input_var"]
+        # AutoPkg keeps step arguments in the env, remove them so a later
+        # RenameVar step does not apply them again
+        var_mapping = self.env.pop("var_mapping", None) or {}
+        rename_var = self.env.pop("rename_var", None)
+        input_var = self.env.pop("input_var", None)
+        move = self.env.pop("move", False)
+
+        if not var_mapping and not rename_var:
+            raise ProcessorError(
+                "Either var_mapping or input_var and rename_var must be "
+                "given."
+            )
+
+        if rename_var:
+            self.env[rename_var] = input_var
+
+        self.rename_vars(var_mapping, move=move)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,257 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""See docstring for TeamsMessage class"""
+
+import json
+
+__all__ = ["TeamsMessage", "section_content_items"]
+
+
+def compile_template(skeleton, *placeholders):
+    """
+    Serializes a JSON skeleton once and splits it at the given placeholder
+    strings. The returned parts are joined with JSON encoded values by
+    render_template.
+    """
+    parts = [json.dumps(skeleton)]
+    for placeholder in placeholders:
+        head, tail = parts.pop().split(json.dumps(placeholder))
+        parts += [head, tail]
+    return parts
+
+
+def render_template(parts, *values):
+    """
+    Fills JSON encoded values into a template made by compile_template.
+    """
+    buffer = [parts[0]]
+    for value, part in zip(values, parts[1:]):
+        buffer.append(value)
+        buffer.append(part)
+    return "".join(buffer)
+
+
+CARD_SKELETON = {
+    "type": "AdaptiveCard",
+    "$schema": "https://adaptivecards.io/schemas/adaptive-card.json",
+    "version": "1.5",
+}
+
+CARD_WITH_IMAGE_TEMPLATE = compile_template(
+    {
+        **CARD_SKELETON,
+        "body": [
+            {
+                "type": "ColumnSet",
+                "columns": [
+                    {
+                        "type": "Column",
+                        "width": "auto",
+                        "items": [
+                            {
+                                "type": "Image",
+                                "url": "__image_url__",
+                                "size": "Medium",
+                            }
+                        ],
+                    },
+                    {
+                        "type": "Column",
+                        "width": "stretch",
+                        "items": "__content_items__",
+                    },
+                ],
+            }
+        ],
+    },
+    "__image_url__",
+    "__content_items__",
+)
+
+CARD_TEMPLATE = compile_template(
+    {
+        **CARD_SKELETON,
+        "body": [{"type": "Container", "items": "__content_items__"}],
+    },
+    "__content_items__",
+)
+
+
+def section_content_items(section):
+    """
+    Returns the Adaptive Card items for a single digest section.
+    """
+    return [
+        {
+            "type": "TextBlock",
+            "text": section["title"],
+            "wrap": True,
+            "weight": "bolder",
+            "separator": True,
+        },
+        {
+            "type": "FactSet",
+            "facts": [
+                {"title": fact["name"], "value": fact["value"]}
+                for fact in section["facts"]
+            ],
+        },
+    ]
+
+
+class TeamsMessage:
+    """
+    Message model of MunkiRepoTeamsNotifier, rendered as Adaptive Card for
+    Microsoft Teams or by the other notification backends.
+    """
+
+    title = ""
+    subtitle = ""
+    facts = []
+    links = []
+    sections = []
+    image_url = ""
+    verbose_level = 1
+
+    def __init__(
+        self,
+        title="",
+        image_url="",
+        verbose_level=1,
+    ):
+        self.title = title
+        self.image_url = image_url
+        self.facts = []
+        self.links = []
+        self.sections = []
+        self.verbose_level = verbose_level
+
+    def output(self, msg, verbose_level=1) -> None:
+        """Print a message if verbosity is >= verbose_level"""
+        if self.verbose_level >= verbose_level:
+            print(f"{self.__class__.__name__}: {msg}")
+
+    def set_title(self, title):
+        self.title = title
+
+    def set_subtitle(self, subtitle):
+        self.subtitle = subtitle
+
+    def add_fact(self, name, value):
+        self.facts.append({"name": name, "value": value})
+
+    def add_link(self, link_options):
+        self.links.append(
+            {
+                "url": link_options.get("url", ""),
+                "name": link_options.get("name", ""),
+                "tooltip": link_options.get("tooltip", ""),
+                "icon": link_options.get("icon", ""),
+                "mode": link_options.get("mode", ""),
+                "style": link_options.get("style", ""),
+            }
+        )
+
+    def add_section(self, title, facts):
+        """
+        Adds a titled block of facts, used to combine several recipe
+        results into one digest message.
+        """
+        self.sections.append({"title": title, "facts": facts})
+
+    def set_image(self, image_url):
+        self.image_url = image_url
+
+    def link_action(self, link):
+        return {
+            "type": "Action.OpenUrl",
+            "title": link["name"],
+            "url": link["url"],
+            "iconUrl": (
+                (f"icon:{link.get('icon')}") if link.get("icon") else None
+            ),
+            "tooltip": link.get("tooltip"),
+            "mode": link.get("mode", "primary"),
+            "style": link.get("style", "default"),
+        }
+
+    def create_content_items(self):
+        content_items = []
+        if self.title:
+            content_items.append(
+                {
+                    "type": "TextBlock",
+                    "text": self.title,
+                    "wrap": True,
+                    "style": "heading",
+                }
+            )
+
+        if self.subtitle:
+            content_items.append(
+                {
+                    "type": "TextBlock",
+                    "text": self.subtitle,
+                    "wrap": True,
+                    "style": "columnHeader",
+                }
+            )
+
+        if self.facts:
+            fact_items = [
+                {"title": fact["name"], "value": fact["value"]}
+                for fact in self.facts
+            ]
+            content_items.append({"type": "FactSet", "facts": fact_items})
+
+        for section in self.sections:
+            content_items.extend(section_content_items(section))
+
+        if self.links:
+            action_items = [self.link_action(link) for link in self.links]
+            content_items.append(
+                {"type": "ActionSet", "actions": action_items}
+            )
+
+        return content_items
+
+    def to_json(self):
+        """
+        Converts the TeamsMessage to a JSON formatted Adaptive Card.
+        """
+        content_items = json.dumps(self.create_content_items())
+
+        if self.image_url:
+            return render_template(
+                CARD_WITH_IMAGE_TEMPLATE,
+                json.dumps(self.image_url),
+                content_items,
+            )
+
+        return render_template(CARD_TEMPLATE, content_items)
+
+    def to_dict(self):
+        """
+        Returns the plain message model, used by non-Teams backends.
+        """
+        return {
+            "title": self.title,
+            "subtitle": self.subtitle,
+            "image_url": self.image_url,
+            "facts": self.facts,
+            "links": self.links,
+            "sections": self.sections,
+        }
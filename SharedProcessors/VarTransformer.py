@@ -0,0 +1,173 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""See docstring for VarTransformer class"""
+
+import os
+import re
+import sys
+from functools import lru_cache
+
+# pylint: disable=E0401
+from autopkglib import ProcessorError
+
+# RenameVar lives next to this file, adding its folder to sys.path violates
+# flake8 E402, hence the noqa comment.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from RenameVar import RenameVar  # noqa: E402 pylint: disable=C0413,E0401
+
+__all__ = ["VarTransformer"]
+
+REGEX_FLAGS = {
+    "i": re.IGNORECASE,
+    "m": re.MULTILINE,
+    "s": re.DOTALL,
+    "x": re.VERBOSE,
+}
+
+VERSION_PATTERN = re.compile(r"\d+(?:\.\d+)*")
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern, flags=""):
+    """Compile a regular expression once per process, flags is a string of
+    the letters in REGEX_FLAGS."""
+
+    compile_flags = 0
+    for flag in flags:
+        if flag not in REGEX_FLAGS:
+            raise ProcessorError(f"Unknown regex flag '{flag}'")
+        compile_flags |= REGEX_FLAGS[flag]
+
+    try:
+        return re.compile(pattern, compile_flags)
+    except re.error as err:
+        raise ProcessorError(f"Invalid pattern '{pattern}': {err}") from err
+
+
+def normalize_version(value, parts=0):
+    """Return the first dotted number of value, e.g. '1.2' of 'v1.2-beta'.
+    With parts given, it is padded with zeros or cut to that many parts."""
+
+    match = VERSION_PATTERN.search(str(value))
+    if not match:
+        raise ProcessorError(f"No version number found in '{value}'")
+
+    numbers = [str(int(number)) for number in match.group(0).split(".")]
+    if parts:
+        numbers = (numbers + ["0"] * parts)[:parts]
+
+    return ".".join(numbers)
+
+
+class VarTransformer(RenameVar):
+    """Run a list of string operations on variables in a single step,
+    replacing chains of RenameVar, FindAndReplace and similar processors.
+
+    Each entry of operations is a dictionary with an "op" key:
+
+    - rename: copy variables as in RenameVar, with "var_mapping" and
+      optional "move".
+    - replace: substitute the regex "pattern" in variable "input" with
+      "replacement" (default ""), optional "count" and "flags" (e.g. "i").
+    - split: split variable "input" at "separator" (default whitespace)
+      into a list, optional "maxsplit".
+    - join: join list variable "input" with "separator" (default "").
+    - normalize_version: take the first dotted number of variable "input"
+      without leading zeros, optionally padded or cut to "parts" parts.
+
+    Except for rename, the result is written to "output", which defaults to
+    "input". Operations run in order and see the results of earlier ones.
+    Patterns are compiled once per process."""
+
+    input_variables = {
+        "operations": {
+            "required": True,
+            "description": (
+                "List of operation dictionaries, see the processor "
+                "description."
+            ),
+        },
+    }
+
+    output_variables = {}
+
+    description = __doc__
+
+    def get_input(self, operation):
+        """Return the value of the input variable of an operation."""
+
+        name = operation.get("input")
+        if not name:
+            raise ProcessorError(f"Operation {operation} requires an input")
+        if name not in self.env:
+            raise ProcessorError(f"Unknown input variable '{name}'")
+
+        return self.env[name]
+
+    def run_operation(self, operation):
+        """Run a single operation and store its result."""
+
+        op_name = operation.get("op")
+
+        if op_name == "rename":
+            self.rename_vars(
+                operation.get("var_mapping") or {},
+                move=operation.get("move"),
+            )
+            return
+
+        value = self.get_input(operation)
+
+        if op_name == "replace":
+            pattern = compile_pattern(
+                operation.get("pattern", ""), operation.get("flags", "")
+            )
+            result = pattern.sub(
+                operation.get("replacement", ""),
+                str(value),
+                count=int(operation.get("count", 0)),
+            )
+        elif op_name == "split":
+            result = str(value).split(
+                operation.get("separator"),
+                int(operation.get("maxsplit", -1)),
+            )
+        elif op_name == "join":
+            if isinstance(value, str):
+                raise ProcessorError(
+                    f"join requires a list, '{operation['input']}' is a "
+                    "string"
+                )
+            result = operation.get("separator", "").join(
+                str(item) for item in value
+            )
+        elif op_name == "normalize_version":
+            result = normalize_version(value, int(operation.get("parts", 0)))
+        else:
+            raise ProcessorError(f"Unknown operation '{op_name}'")
+
+        output = operation.get("output") or operation["input"]
+        self.env[output] = result
+        self.output(f"{op_name}: {output} = {result}", 2)
+
+    def main(self):
+        for operation in self.env["operations"]:
+            self.run_operation(operation)
+
+
+if __name__ == "__main__":
+    PROCESSOR = VarTransformer()
+    PROCESSOR.execute_shell()
@@ -18,45 +18,285 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import glob
+import hashlib
+import html
+import io
 import json
+import os
+import plistlib
 import re
+import sys
+from time import time
 
 # pylint: disable=W0611
-from autopkglib import Processor, ProcessorError, URLGetter  # noqa: F401
+from autopkglib import Processor, ProcessorError  # noqa: F401
+
+# The shared base class lives in the SharedProcessors folder of this repo.
+# Adding it to sys.path violates flake8 E402, hence the noqa comment. The
+# same lines are in every processor using it, hence duplicate-code.
+# pylint: disable=C0413,E0401,duplicate-code
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "SharedProcessors",
+    ),
+)
+from CachedPageURLProvider import (  # noqa: E402
+    PAGE_CACHE_INPUT_VARIABLES,
+    PAGE_CACHE_OUTPUT_VARIABLES,
+    CachedPageURLProvider,
+)
+
+# pylint: enable=C0413,E0401,duplicate-code
 
 __all__ = ["ARCHICADUpdatesProcessor"]
 
+DOWNLOADS_URL = "https://graphisoft.com/de-de/downloads?section=update"
+
+# One download of the page is shared by all ARCHICAD recipes of a run
+PAGE_CACHE_TTL = 60 * 60
+
+PAGE_ATTRIBUTES = ("categories", "platforms", "downloads")
+
+# The page is scanned in chunks, no single attribute may exceed the ceiling
+PAGE_CHUNK_SIZE = 64 * 1024
+MAX_ATTRIBUTE_BYTES = 32 * 1024 * 1024
+
+SUPPORTED_ARCHITECTURES = {"INTEL": "x86_64", "ARM": "arm64"}
+
+# Parsed page data and build catalog of the last downloads page
+_CATALOG_CACHE = {}
+
+
+class AttributeCapture:
+    """
+    Collects the value of a single attribute from consecutive buffers up to
+    its closing quote.
+    """
+
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.parts = []
+        self.size = 0
+
+    def feed(self, buffer):
+        """
+        Consume the buffer up to the closing quote and return the rest
+        after it, or None if the value continues in the next chunk.
+        """
+        end = buffer.find(b"'")
+        self.size += len(buffer) if end == -1 else end
+        if self.size > self.max_bytes:
+            raise ProcessorError(
+                f"The :{self.name} attribute on the downloads page exceeds "
+                f"{self.max_bytes} bytes."
+            )
+        if end == -1:
+            self.parts.append(buffer)
+            return None
+        self.parts.append(buffer[:end])
+        end += 1
+        return buffer[end:]
+
+    @property
+    def value(self):
+        return b"".join(self.parts)
+
+
+def decode_attributes(found):
+    """
+    Return the captured attribute values decoded and unescaped.
+    """
+    attributes = {}
+    for name, value in found.items():
+        try:
+            text = value.decode("utf-8")
+        except UnicodeDecodeError as err:
+            raise ProcessorError(
+                f"The :{name} attribute on the downloads page is not valid "
+                f"UTF-8: {err}"
+            ) from err
+        attributes[name] = html.unescape(text) if "&" in text else text
+    return attributes
+
+
+def extract_attributes(
+    stream,
+    names,
+    chunk_size=PAGE_CHUNK_SIZE,
+    max_attribute_bytes=MAX_ATTRIBUTE_BYTES,
+):
+    """
+    Scan a binary stream once and return the decoded and unescaped values
+    of the single quoted Vue attributes (:name='...') with the given names.
+    Only the attribute values are kept in memory, reading stops as soon as
+    all attributes were found.
+    """
+    markers = {f":{name}='".encode("ascii"): name for name in names}
+    # Keep enough bytes to find markers spanning two chunks
+    overlap = max(len(marker) for marker in markers) - 1
+    found = {}
+    buffer = b""
+    capture = None
+
+    while len(found) < len(markers):
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+
+        while buffer:
+            if capture:
+                rest = capture.feed(buffer)
+                if rest is None:
+                    buffer = b""
+                    break
+                found[capture.name] = capture.value
+                buffer = rest
+                capture = None
+                continue
+
+            positions = [
+                (buffer.find(marker), marker)
+                for marker, name in markers.items()
+                if name not in found
+            ]
+            positions = [item for item in positions if item[0] != -1]
+            if not positions:
+                buffer = buffer[-overlap:]
+                break
+
+            position, marker = min(positions)
+            capture = AttributeCapture(markers[marker], max_attribute_bytes)
+            position += len(marker)
+            buffer = buffer[position:]
+
+    return decode_attributes(found)
+
+
+def build_sort_key(build):
+    """
+    Sort key comparing build numbers numerically, so "1000" is newer than
+    "999".
+    """
+    return [int(part) for part in re.findall(r"\d+", build)]
+
 
 # pylint: disable=E0239
 # pylint: disable=R0903
-class ARCHICADUpdatesProcessor(URLGetter):
+class ARCHICADUpdatesProcessor(CachedPageURLProvider):
     """
     This processor finds the URL for the desired version, localization, and
     type of ARCHICAD.
     """
 
+    default_page_cache_ttl = PAGE_CACHE_TTL
+    page_name = "downloads page"
+
     input_variables = {
+        **PAGE_CACHE_INPUT_VARIABLES,
         "major_version": {
-            "required": True,
+            "required": False,
             "description": (
                 "The ARCHICAD Major Version to look for available patches."
             ),
         },
         "localization": {
-            "required": True,
+            "required": False,
             "description": "The Localization to looks for available patches.",
         },
         "release_type": {
-            "required": True,
+            "required": False,
             "description": "The release type to look for available patches.",
         },
         "ARCHITECTURE": {
             "required": False,
             "description": "INTEL or ARM, falls back to INTEL if not set.",
         },
+        "variants": {
+            "required": False,
+            "description": (
+                "List of dictionaries with major_version, localization, "
+                "release_type and ARCHITECTURE to resolve in one run. "
+                "Missing keys fall back to the single variant inputs. "
+                "Results are returned in variant_results."
+            ),
+        },
+        "downloads_page_path": {
+            "required": False,
+            "description": (
+                "(Advanced) Read the downloads page from this local file "
+                "instead of downloading it, e.g. to check a saved page "
+                "offline."
+            ),
+        },
+        "build_history_path": {
+            "required": False,
+            "description": (
+                "Path to a JSON file recording the builds seen per variant. "
+                "Defaults to ARCHICADUpdatesProcessor/build_history.json "
+                "inside AutoPkg's CACHE_DIR. Set to an empty string to "
+                "disable the history."
+            ),
+        },
+        "skip_unchanged_build": {
+            "required": False,
+            "description": (
+                "If True and the newest build was already found in the "
+                "Munki repo by a previous run, no url is returned and the "
+                "rest of the recipe is skipped without looking at the repo "
+                "again. Requires skip_if_in_munki_repo, so a build whose "
+                "download or import failed is tried again."
+            ),
+            "default": False,
+        },
+        "skip_if_in_munki_repo": {
+            "required": False,
+            "description": (
+                "If True, the Munki repo at MUNKI_REPO is checked for a "
+                "pkginfo with NAME and the resolved version. If it exists, "
+                "no url is returned and the rest of the recipe is skipped."
+            ),
+            "default": False,
+        },
+        "MUNKI_REPO": {
+            "required": False,
+            "description": "Path to a mounted Munki repo.",
+        },
+        "MUNKI_PKGINFO_FILE_EXTENSION": {
+            "required": False,
+            "description": "Extension of pkginfo files. Default is 'plist'.",
+            "default": "plist",
+        },
+        "NAME": {
+            "required": False,
+            "description": "Name of the Munki item, used with "
+            "skip_if_in_munki_repo.",
+        },
+        "page_cache_dir": {
+            "required": False,
+            "description": (
+                "Directory to cache the GRAPHISOFT downloads page in. "
+                "Defaults to ARCHICADUpdatesProcessor inside AutoPkg's "
+                "CACHE_DIR. Set to an empty string to disable the cache."
+            ),
+        },
+        "page_cache_ttl": {
+            "required": False,
+            "description": (
+                "Seconds a cached downloads page is used without asking "
+                "the server. Afterwards it is revalidated with a "
+                "conditional request."
+            ),
+            "default": PAGE_CACHE_TTL,
+        },
     }
     # Amended to output build number and version (jutonium)
     output_variables = {
+        **PAGE_CACHE_OUTPUT_VARIABLES,
         "url": {"description": "Returns the url to download."},
         "build": {"description": "Returns the build number."},
         "supported_architecture": {
@@ -66,30 +306,181 @@ class ARCHICADUpdatesProcessor(URLGetter):
             "description": "Returns the version computed from major_version "
             "and build number. Same as CFBundleVersion."
         },
+        "new_build": {
+            "description": "True if the build was not seen by a previous "
+            "run according to the build history."
+        },
+        "stop_processing_recipe": {
+            "description": "Set to True if skip_unchanged_build or "
+            "skip_if_in_munki_repo is set and there is nothing new."
+        },
+        "variant_results": {
+            "description": "List of dictionaries with url, build, version "
+            "and supported_architecture for each of the given variants."
+        },
+        "page_cache_status": {
+            "description": "How the downloads page was retrieved: hit, "
+            "revalidated, miss or disabled."
+        },
     }
 
     description = __doc__
 
-    def _get_category_id(self, response):
-        """Extract and return the category ID for updates."""
-        json_response = re.search(
-            r":categories='(.*)'", response.decode("utf-8")
-        ).group(1)
-        json_data = json.loads(json_response)
+    def _get_build_history_path(self):
+        """Return the build history path, empty if it is disabled."""
+        history_path = self.env.get("build_history_path")
+        if history_path is not None:
+            return history_path
+
+        if not self.env.get("CACHE_DIR"):
+            return ""
+
+        return os.path.join(
+            self.env["CACHE_DIR"],
+            "ARCHICADUpdatesProcessor",
+            "build_history.json",
+        )
+
+    def _load_build_history(self):
+        """Return the recorded builds per variant."""
+        history_path = self._get_build_history_path()
+        if not history_path:
+            return {}
 
-        for json_object in json_data:
+        return self.read_json(history_path)
+
+    def _save_build_history(self, history):
+        """Write the recorded builds per variant."""
+        history_path = self._get_build_history_path()
+        if not history_path:
+            return
+
+        os.makedirs(os.path.dirname(history_path), exist_ok=True)
+        self.write_json(history_path, history)
+
+    def _get_variant_key(self, variant):
+        """Return a string identifying a variant."""
+        return "_".join(
+            [
+                str(variant.get("major_version")),
+                str(variant.get("localization")),
+                str(variant.get("release_type")),
+                variant.get("ARCHITECTURE") or "INTEL",
+            ]
+        )
+
+    def _record_build(self, history, result):
+        """
+        Add the build of a resolved variant to the history. Return whether
+        it differs from the last one seen and whether a previous run found
+        it in the Munki repo.
+        """
+        variant_key = self._get_variant_key(result)
+        entry = history.setdefault(variant_key, {"builds": [], "last": ""})
+        new_build = entry["last"] != result["build"]
+        imported = entry.get("imported") == result["build"]
+
+        if result["build"] not in entry["builds"]:
+            entry["builds"] = sorted(
+                entry["builds"] + [result["build"]], key=build_sort_key
+            )
+        entry["last"] = result["build"]
+        entry["updated"] = time()
+
+        if not new_build:
+            self.output(
+                f"No new build for {variant_key} since last run "
+                f"({result['build']})"
+            )
+
+        return new_build, imported
+
+    def _record_import(self, history, result):
+        """
+        Mark the build of a resolved variant as found in the Munki repo, so
+        skip_unchanged_build can skip it without looking at the repo.
+        """
+        entry = history[self._get_variant_key(result)]
+        entry["imported"] = result["build"]
+
+    def _is_in_munki_repo(self, name, version):
+        """
+        Return True if the Munki repo contains a pkginfo with the given
+        name and version.
+        """
+        munki_repo = self.env.get("MUNKI_REPO")
+        pkgsinfo_dir = os.path.join(munki_repo or "", "pkgsinfo")
+
+        if not munki_repo or not os.path.isdir(pkgsinfo_dir):
+            self.output(f"No Munki pkgsinfo directory at {pkgsinfo_dir}")
+            return False
+
+        file_extension = self.env.get("MUNKI_PKGINFO_FILE_EXTENSION", "plist")
+        if file_extension:
+            file_extension = "." + file_extension.strip(".")
+
+        for pkginfo_path in glob.iglob(
+            os.path.join(
+                pkgsinfo_dir, "**", f"{name}-{version}*{file_extension}"
+            ),
+            recursive=True,
+        ):
+            try:
+                with open(pkginfo_path, "rb") as pkginfo_file:
+                    pkginfo = plistlib.load(pkginfo_file)
+            except (OSError, plistlib.InvalidFileException):
+                continue
+
+            if (
+                pkginfo.get("name") == name
+                and pkginfo.get("version") == version
+            ):
+                self.output(f"Found {name} {version} at {pkginfo_path}")
+                return True
+
+        return False
+
+    def _parse_downloads_page(self, stream):
+        """
+        Scan the page once and parse its embedded JSON attributes. Raise
+        a ProcessorError naming the attribute if the page layout changed.
+        """
+        attributes = extract_attributes(stream, PAGE_ATTRIBUTES)
+
+        page_data = {}
+        for name in PAGE_ATTRIBUTES:
+            if name not in attributes:
+                raise ProcessorError(
+                    f"Unable to find the :{name} attribute on the downloads "
+                    "page, the page layout may have changed."
+                )
+
+            try:
+                page_data[name] = json.loads(attributes[name])
+            except ValueError as err:
+                raise ProcessorError(
+                    f"Unable to parse the :{name} attribute on the downloads "
+                    f"page, the page layout may have changed: {err}"
+                ) from err
+
+            if not isinstance(page_data[name], list):
+                raise ProcessorError(
+                    f"Expected a list in the :{name} attribute on the "
+                    "downloads page, the page layout may have changed."
+                )
+
+        return page_data
+
+    def _get_category_id(self, page_data):
+        """Extract and return the category ID for updates."""
+        for json_object in page_data["categories"]:
             if json_object.get("slug") == "update":
                 return json_object.get("id")
 
         raise ProcessorError("Unable to find a url based on the type update.")
 
-    def _get_platform_id(self, response, architecture):
+    def _get_platform_id(self, page_data, architecture):
         """Extract and return the platform ID for the architecture."""
-        json_response = re.search(
-            r":platforms='(.*)'", response.decode("utf-8")
-        ).group(1)
-        json_data = json.loads(json_response)
-
         if architecture == "INTEL":
             slug = "mac-intel-processor"
         elif architecture == "ARM":
@@ -97,7 +488,7 @@ class ARCHICADUpdatesProcessor(URLGetter):
         else:
             raise ProcessorError("Invalid architecture specified.")
 
-        for json_object in json_data:
+        for json_object in page_data["platforms"]:
             if json_object.get("slug") == slug:
                 return json_object.get("id")
 
@@ -105,34 +496,156 @@ class ARCHICADUpdatesProcessor(URLGetter):
             "Unable to find a url based on the provided architecture."
         )
 
-    def _find_available_builds(self, response, criteria):
-        """Find and return available builds matching the criteria."""
-        json_response = re.search(
-            r":downloads='(.*)'", response.decode("utf-8")
-        ).group(1)
-        json_data = json.loads(json_response)
-        available_builds = {}
+    def _build_catalog(self, page_data):
+        """
+        Index all ARCHICAD downloads by (version, locale, edition, platform,
+        category), each entry maps build numbers to download urls in
+        ascending numeric order.
+        """
+        catalog = {}
 
-        for json_object in json_data:
+        for json_object in page_data["downloads"]:
             if not isinstance(json_object, dict):
                 continue
 
-            if all(
-                (
-                    json_object.get("category") == criteria["category_id"],
-                    json_object.get("version") == criteria["major_version"],
-                    json_object.get("locale") == criteria["localization"],
-                    json_object.get("edition") == criteria["release_type"],
-                    json_object.get("platform")
-                    == int(criteria["platform_id"]),
-                    json_object.get("type") == "Archicad",
-                    json_object.get("build"),
-                )
+            if json_object.get("type") != "Archicad" or not json_object.get(
+                "build"
             ):
-                mac_link = json_object.get("data", {}).get("url")
-                available_builds[str(json_object.get("build"))] = mac_link
+                continue
+
+            key = (
+                json_object.get("version"),
+                json_object.get("locale"),
+                json_object.get("edition"),
+                json_object.get("platform"),
+                json_object.get("category"),
+            )
+            mac_link = json_object.get("data", {}).get("url")
+            catalog.setdefault(key, {})[
+                str(json_object.get("build"))
+            ] = mac_link
+
+        if not catalog:
+            raise ProcessorError(
+                "No ARCHICAD builds found on the downloads page, the page "
+                "layout may have changed."
+            )
 
-        return available_builds
+        # Order the builds of every entry numerically, newest last
+        return {
+            key: dict(
+                sorted(
+                    builds.items(), key=lambda item: build_sort_key(item[0])
+                )
+            )
+            for key, builds in catalog.items()
+        }
+
+    def _get_catalog(self, page):
+        """
+        Return parsed page data and build catalog for a page given as path
+        or bytes, parsing each page only once per process.
+        """
+        if isinstance(page, bytes):
+            digest = hashlib.sha256(page).hexdigest()
+        else:
+            page_stat = os.stat(page)
+            digest = f"{page}:{page_stat.st_mtime_ns}:{page_stat.st_size}"
+
+        if digest not in _CATALOG_CACHE:
+            if isinstance(page, bytes):
+                with io.BytesIO(page) as stream:
+                    page_data = self._parse_downloads_page(stream)
+            else:
+                with open(page, "rb") as stream:
+                    page_data = self._parse_downloads_page(stream)
+            _CATALOG_CACHE.clear()
+            _CATALOG_CACHE[digest] = (
+                page_data,
+                self._build_catalog(page_data),
+            )
+
+        return _CATALOG_CACHE[digest]
+
+    def _find_available_builds(self, catalog, criteria):
+        """Find and return available builds matching the criteria."""
+        return catalog.get(
+            (
+                criteria["major_version"],
+                criteria["localization"],
+                criteria["release_type"],
+                int(criteria["platform_id"]),
+                criteria["category_id"],
+            ),
+            {},
+        )
+
+    def _resolve_variant(self, page_data, catalog, variant):
+        """Return url, build and version of the newest build of a variant."""
+        architecture = variant.get("ARCHITECTURE") or "INTEL"
+
+        criteria = {
+            "category_id": self._get_category_id(page_data),
+            "platform_id": self._get_platform_id(page_data, architecture),
+            "major_version": variant.get("major_version"),
+            "localization": variant.get("localization"),
+            "release_type": variant.get("release_type"),
+        }
+        available_builds = self._find_available_builds(catalog, criteria)
+
+        if not available_builds:
+            raise ProcessorError(
+                "Unable to find a url based on the parameters provided: "
+                f"{criteria}"
+            )
+
+        build = list(available_builds)[-1]
+
+        return {
+            "major_version": criteria["major_version"],
+            "localization": criteria["localization"],
+            "release_type": criteria["release_type"],
+            "ARCHITECTURE": architecture,
+            "url": available_builds[build],
+            "build": build,
+            "version": f"{criteria['major_version']}.0.0.{build}",
+            "supported_architecture": SUPPORTED_ARCHITECTURES[architecture],
+        }
+
+    def _resolve_variants(self, variants):
+        """
+        Return the resolved builds of all variants. While the downloads page
+        is unchanged the results of the previous run are reused without
+        parsing the page again.
+        """
+        self.stage_timings = {}
+        variant_keys = [self._get_variant_key(variant) for variant in variants]
+
+        with self.stage("fetch"):
+            if self.env.get("downloads_page_path"):
+                self.page = {}
+                page = self.env["downloads_page_path"]
+            else:
+                self.fetch_page(DOWNLOADS_URL)
+                page = self.page["data"] or self.page["path"]
+
+        results = [self.page_result(key) for key in variant_keys]
+        if all(result is not None for result in results):
+            self.output("Downloads page unchanged, reusing resolved builds")
+        else:
+            with self.stage("parse"):
+                page_data, catalog = self._get_catalog(page)
+            with self.stage("resolve"):
+                results = [
+                    self._resolve_variant(page_data, catalog, variant)
+                    for variant in variants
+                ]
+            for key, result in zip(variant_keys, results):
+                self.store_page_result(key, dict(result))
+
+        self.report_stage_timings()
+
+        return results
 
     def _set_output_variables(self, url, build, version, architecture):
         """Set output variables in the environment."""
@@ -150,36 +663,83 @@ class ARCHICADUpdatesProcessor(URLGetter):
 
     def main(self):
         """Main process."""
-        major_version = self.env.get("major_version")
-        localization = self.env.get("localization")
-        release_type = self.env.get("release_type")
-        architecture = self.env.get("ARCHITECTURE", "INTEL")
+        default_variant = {
+            "major_version": self.env.get("major_version"),
+            "localization": self.env.get("localization"),
+            "release_type": self.env.get("release_type"),
+            "ARCHITECTURE": self.env.get("ARCHITECTURE", "INTEL"),
+        }
+        variants = self.env.get("variants")
+
+        if not variants and not all(
+            default_variant[key]
+            for key in ("major_version", "localization", "release_type")
+        ):
+            raise ProcessorError(
+                "Either major_version, localization and release_type or "
+                "variants must be given."
+            )
+
+        if self.env.get("skip_unchanged_build") and not self.env.get(
+            "skip_if_in_munki_repo"
+        ):
+            raise ProcessorError(
+                "skip_unchanged_build requires skip_if_in_munki_repo, "
+                "otherwise a failed download or import would never be "
+                "retried."
+            )
 
-        response = self.download(
-            "https://graphisoft.com/de-de/downloads?section=update"
+        results = self._resolve_variants(
+            [{**default_variant, **variant} for variant in variants]
+            if variants
+            else [default_variant]
         )
+        history = self._load_build_history()
 
-        category_id = self._get_category_id(response)
-        platform_id = self._get_platform_id(response, architecture)
+        if variants:
+            for result in results:
+                self._record_build(history, result)
+                self.output(
+                    f"{result['major_version']} {result['localization']} "
+                    f"{result['release_type']} {result['ARCHITECTURE']}: "
+                    f"build {result['build']}, {result['url']}"
+                )
+            self.env["variant_results"] = results
+            self._save_build_history(history)
+            return
 
-        criteria = {
-            "category_id": category_id,
-            "platform_id": platform_id,
-            "major_version": major_version,
-            "localization": localization,
-            "release_type": release_type,
-        }
-        available_builds = self._find_available_builds(response, criteria)
+        result = results[0]
+        self.env["new_build"], imported = self._record_build(history, result)
 
-        if available_builds:
-            build = sorted(available_builds.keys())[-1]
-            version = f"{major_version}.0.0.{build}"
-            url = available_builds[build]
-            self._set_output_variables(url, build, version, architecture)
-        else:
-            raise ProcessorError(
-                "Unable to find a url based on the parameters provided."
+        if self.env.get("skip_unchanged_build") and imported:
+            self._save_build_history(history)
+            self.output(
+                "Build was already found in the Munki repo by a previous "
+                "run, skipping the rest of the recipe"
             )
+            self.env["stop_processing_recipe"] = True
+            return
+
+        if self.env.get("skip_if_in_munki_repo") and self._is_in_munki_repo(
+            self.env.get("NAME"), result["version"]
+        ):
+            self._record_import(history, result)
+            self._save_build_history(history)
+            self.output(
+                "Build is already in the Munki repo, skipping the rest of "
+                "the recipe"
+            )
+            self.env["stop_processing_recipe"] = True
+            return
+
+        self._save_build_history(history)
+
+        self._set_output_variables(
+            result["url"],
+            result["build"],
+            result["version"],
+            result["ARCHITECTURE"],
+        )
 
 
 if __name__ == "__main__":
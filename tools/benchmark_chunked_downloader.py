@@ -0,0 +1,204 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Throughput and resume benchmark for ChunkedURLDownloader.
+
+Downloads random data from the local range stand-in once per number of
+connections and reports MB per second, retried requests and whether the
+result matches the served bytes. A second download per setting is
+interrupted by failing requests without retries and then resumed, the
+resumed run should only fetch the missing chunks.
+
+    ./tools/benchmark_chunked_downloader.py --size 200000000 \
+        --connections 1,4,8 --fail-rate 0.5 --fail-status 500
+
+autopkglib is imported from AutoPkg's installation, use --autopkglib for
+another location. Exits with 1 if any download failed or differs.
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARED_PROCESSORS_DIR = os.path.join(
+    os.path.dirname(TOOLS_DIR), "SharedProcessors"
+)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument("--size", type=int, default=64 * 1024 * 1024)
+    parser.add_argument(
+        "--connections",
+        default="1,4,8",
+        help="Comma separated numbers of parallel connections to compare.",
+    )
+    parser.add_argument("--chunk-size", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--retries", type=int, default=10)
+    parser.add_argument("--retry-delay", type=float, default=0.01)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", default="500")
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--autopkglib", default="/Library/AutoPkg")
+    parser.add_argument(
+        "--json", action="store_true", help="Print the results as JSON."
+    )
+    return parser.parse_args()
+
+
+def download(processor_class, env):
+    """
+    Run the processor once, return the seconds taken, the error if it
+    failed and the sha256 of the downloaded file.
+    """
+    processor = processor_class(env=dict(env))
+    start = perf_counter()
+    try:
+        processor.main()
+    except Exception as err:  # pylint: disable=W0718
+        return perf_counter() - start, str(err), ""
+    elapsed = perf_counter() - start
+
+    digest = hashlib.sha256()
+    with open(processor.env["pathname"], "rb") as download_file:
+        for block in iter(lambda: download_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return elapsed, "", digest.hexdigest()
+
+
+def run_setting(processor_class, standin, args, connections):
+    """Measure a fresh and a resumed download with the given connections."""
+    expected = hashlib.sha256(standin.content).hexdigest()
+    env = {
+        "url": standin.url,
+        "connections": connections,
+        "chunk_size": args.chunk_size,
+        "chunk_retries": args.retries,
+        "chunk_retry_delay": args.retry_delay,
+        "verbose": 0,
+    }
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        standin.reset(
+            fail_rate=args.fail_rate,
+            fail_first=0,
+            truncate_rate=args.truncate_rate,
+        )
+        elapsed, error, digest = download(
+            processor_class, dict(env, RECIPE_CACHE_DIR=cache_dir)
+        )
+        fresh = standin.stats()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Fail the first request without retries, then resume
+        standin.reset(fail_rate=0.0, fail_first=1, truncate_rate=0)
+        download(
+            processor_class,
+            dict(env, RECIPE_CACHE_DIR=cache_dir, chunk_retries=0),
+        )
+        standin.reset(fail_first=0)
+        resume_elapsed, resume_error, resume_digest = download(
+            processor_class, dict(env, RECIPE_CACHE_DIR=cache_dir)
+        )
+        resumed = standin.stats()
+
+    return {
+        "connections": connections,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(len(standin.content) / elapsed / 1e6, 1),
+        "requests": fresh["requests"],
+        "injected": fresh["injected"],
+        "truncated": fresh["truncated"],
+        "error": error,
+        "identical": digest == expected,
+        "resume_seconds": round(resume_elapsed, 3),
+        "resume_bytes": resumed["bytes"],
+        "resume_error": resume_error,
+        "resume_identical": resume_digest == expected,
+    }
+
+
+def print_results(results):
+    print(
+        f"{'conn':>4} {'s':>8} {'MB/s':>7} {'requests':>8} {'injected':>8} "
+        f"{'truncated':>9} {'resume s':>8} {'resume MB':>9}  result"
+    )
+    for result in results:
+        ok = result["identical"] and result["resume_identical"]
+        print(
+            f"{result['connections']:>4} {result['seconds']:>8} "
+            f"{result['mb_per_second']:>7} {result['requests']:>8} "
+            f"{result['injected']:>8} {result['truncated']:>9} "
+            f"{result['resume_seconds']:>8} "
+            f"{result['resume_bytes'] / 1e6:>9.1f}  {'ok' if ok else 'FAIL'}"
+        )
+        for name in ("error", "resume_error"):
+            if result[name]:
+                print(f"    {name}: {result[name]}")
+
+
+def main():
+    args = parse_arguments()
+
+    sys.path[:0] = [args.autopkglib, SHARED_PROCESSORS_DIR, TOOLS_DIR]
+    # pylint: disable=C0415,E0401
+    from ChunkedURLDownloader import ChunkedURLDownloader
+    from http_range_standin import HTTPRangeStandIn, status_list
+
+    standin = HTTPRangeStandIn(
+        random.Random(args.seed).randbytes(args.size),
+        fail_status=status_list(args.fail_status),
+        latency=args.latency,
+        seed=args.seed,
+    ).start()
+    try:
+        results = [
+            run_setting(ChunkedURLDownloader, standin, args, int(connections))
+            for connections in args.connections.split(",")
+            if connections
+        ]
+    finally:
+        standin.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+    sys.exit(
+        0
+        if all(
+            result["identical"] and result["resume_identical"]
+            for result in results
+        )
+        else 1
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Micro-benchmark of the FileZillaURLProvider extraction paths.
+
+Compares the previous extraction, a DOTALL search over the whole page, one
+search per div attribute and a findall of every link per architecture,
+with the current one using the precompiled patterns of the processor. It
+runs on the resolvable pages in tools/filezilla_fixtures, optionally
+inflated with further markup in front of the payload div. Decryption is
+the same for both paths and is done once up front.
+
+    ./tools/benchmark_filezilla_extraction.py --inflate 50 --number 2000
+
+autopkglib is imported from AutoPkg's installation, use --autopkglib for
+another location. Exits with 1 if both paths disagree on any page.
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TOOLS_DIR, "filezilla_fixtures")
+FILEZILLA_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "FileZilla")
+
+# Markup repeated in front of the payload div by --inflate
+FILLER = (
+    '<div class="news"><h2>FileZilla Client 3.69.1 released</h2>'
+    '<p>Bugfixes and minor changes, see the <a href="/versions.php">'
+    "changelog</a>.</p></div>\n"
+)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--archs", default="arm64,x86")
+    parser.add_argument(
+        "--inflate",
+        type=int,
+        default=1,
+        help="Copies of filler markup in front of the payload div.",
+    )
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--autopkglib", default="/Library/AutoPkg")
+    return parser.parse_args()
+
+
+def previous_parse_html_div(html_string):
+    """The div extraction before the patterns were precompiled."""
+    div_pattern = r'<div[^>]*id=["\']contentwrapper["\'][^>]*>(.*?)</div>'
+    div_match = re.search(div_pattern, html_string, re.DOTALL | re.IGNORECASE)
+    if not div_match:
+        raise ValueError("Could not find div with id 'contentwrapper'")
+
+    full_div = div_match.group(0)
+    content = div_match.group(1).strip()
+
+    attributes = {}
+    for attr in ["v1", "v2", "v3"]:
+        attr_pattern = rf'{attr}=["\']([^"\']*)["\']'
+        attr_match = re.search(attr_pattern, full_div, re.IGNORECASE)
+        if attr_match:
+            attributes[attr] = attr_match.group(1)
+
+    return {"content": content, "attributes": attributes}
+
+
+def previous_downloads(html_string, archs):
+    """The link and version extraction, one pass per architecture."""
+    downloads = {}
+    for arch in archs:
+        needle = f"macos-{arch}.app.tar.bz2"
+        hrefs = re.findall(r'href=["\'](.*?)["\']', html_string, re.IGNORECASE)
+        url = next(href for href in hrefs if needle in href)
+        version = re.search(r"FileZilla_(\d+\.\d+\.\d+)_macos", url).group(1)
+        downloads[arch] = {"url": url, "version": version}
+    return downloads
+
+
+def current_downloads(processor, html_string, archs):
+    """The link and version extraction of the processor."""
+    return {
+        arch: {"url": url, "version": processor.parse_version_from_url(url)}
+        for arch, url in processor.parse_download_urls(
+            html_string, archs
+        ).items()
+    }
+
+
+def best_microseconds(function, args):
+    """Return the best time of a call in microseconds."""
+    return (
+        min(timeit.repeat(function, number=args.number, repeat=args.repeat))
+        / args.number
+        * 1e6
+    )
+
+
+def benchmark_page(processor, html, args):
+    """Time both paths on a page and check that they agree."""
+    archs = [arch for arch in args.archs.split(",") if arch]
+    marker = html.rfind("<div", 0, html.find("contentwrapper"))
+    html = html[:marker] + FILLER * args.inflate + html[marker:]
+
+    div_data = processor.parse_html_div(html)
+    document = processor.decrypt_string(
+        div_data["content"], div_data["attributes"]
+    )
+    downloads = current_downloads(processor, document, archs)
+    identical = (
+        previous_parse_html_div(html) == div_data
+        and previous_downloads(document, archs) == downloads
+    )
+
+    return {
+        "kb": len(html) / 1024,
+        "previous_parse": best_microseconds(
+            lambda: previous_parse_html_div(html), args
+        ),
+        "current_parse": best_microseconds(
+            lambda: processor.parse_html_div(html), args
+        ),
+        "previous_links": best_microseconds(
+            lambda: previous_downloads(document, archs), args
+        ),
+        "current_links": best_microseconds(
+            lambda: current_downloads(processor, document, archs), args
+        ),
+        "identical": identical,
+    }
+
+
+def main():
+    args = parse_arguments()
+    args.number = max(args.number, 1)
+    args.repeat = max(args.repeat, 1)
+
+    sys.path[:0] = [args.autopkglib, FILEZILLA_DIR]
+    # pylint: disable=C0415,E0401
+    from FileZillaURLProvider import FileZillaURLProvider
+
+    processor = FileZillaURLProvider(env={"verbose": 0})
+    with open(
+        os.path.join(args.fixtures, "expected.json"), encoding="utf-8"
+    ) as expected_file:
+        expectations = json.load(expected_file)
+
+    print(
+        f"{'page':<24} {'KB':>6} {'parse old us':>12} {'parse new us':>12} "
+        f"{'links old us':>12} {'links new us':>12} {'speedup':>7}  result"
+    )
+    failed = False
+    for name, expected in sorted(expectations.items()):
+        if "downloads" not in expected:
+            continue
+        with open(os.path.join(args.fixtures, name), encoding="utf-8") as page:
+            result = benchmark_page(processor, page.read(), args)
+        speedup = (result["previous_parse"] + result["previous_links"]) / (
+            result["current_parse"] + result["current_links"]
+        )
+        print(
+            f"{name:<24} {result['kb']:>6.1f} "
+            f"{result['previous_parse']:>12.1f} "
+            f"{result['current_parse']:>12.1f} "
+            f"{result['previous_links']:>12.1f} "
+            f"{result['current_links']:>12.1f} {speedup:>6.1f}x  "
+            f"{'ok' if result['identical'] else 'FAIL'}"
+        )
+        failed = failed or not result["identical"]
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
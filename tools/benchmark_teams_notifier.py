@@ -0,0 +1,239 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Load benchmark for MunkiRepoTeamsNotifier.
+
+Runs MunkiRepoTeamsNotifier.main once per synthetic recipe result, mixing
+MunkiImporter, MunkiAutoStaging and combined summaries, against the local
+webhook stand-in and reports messages per second and latency percentiles.
+
+    ./tools/benchmark_teams_notifier.py --count 300 --fail-rate 0.1 \
+        --fail-status 429,503 --latency 0.02
+
+autopkglib is imported from AutoPkg's installation, use --autopkglib for
+another location.
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARED_PROCESSORS_DIR = os.path.join(
+    os.path.dirname(TOOLS_DIR), "SharedProcessors"
+)
+
+
+def synthetic_env(index, args, webhook_url, state_dir):
+    """Return the env of one recipe that changed the Munki repo."""
+    name = f"SyntheticApp{index:04d}"
+    version = f"{index % 30}.{index % 7}.{index}"
+    importer = {
+        "data": {
+            "name": name,
+            "version": version,
+            "catalogs": "testing",
+            "pkginfo_path": f"apps/{name}/{name}-{version}.plist",
+            "pkg_repo_path": f"apps/{name}/{name}-{version}.pkg",
+            "icon_repo_path": f"icons/{name}.png",
+        }
+    }
+    autostaging = {
+        "data": {
+            "name": name,
+            "versions": version,
+            "munki_staging_catalog": "testing",
+            "munki_production_catalog": "production",
+        }
+    }
+    kind = index % 3
+
+    env = {
+        "NAME": name,
+        "verbose": 0,
+        "verbosity": args.verbosity,
+        "CACHE_DIR": state_dir,
+        "teams_webhook_url": webhook_url,
+        "munki_repo_changed": True,
+        "munki_info": {
+            "name": name,
+            "display_name": f"Synthetic App {index}",
+            "supported_architectures": ["arm64", "x86_64"],
+        },
+        "munki_importer_summary_result": importer if kind != 1 else None,
+        "munki_autostaging_summary_result": autostaging if kind else None,
+        "notification_retry_delay": args.retry_delay,
+        "notification_rate_limit": args.rate_limit,
+        "notification_rate_burst": args.rate_burst,
+    }
+    if args.digest:
+        env["teams_digest_spool"] = os.path.join(state_dir, "digest.jsonl")
+        env["teams_digest_flush"] = index == args.count - 1
+    if args.outbox:
+        env["notification_outbox"] = os.path.join(state_dir, "outbox")
+
+    return env
+
+
+def percentile(values, share):
+    """Return the value below which the given share of values lies."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument(
+        "--url",
+        help="Webhook to post to, by default a stand-in is started.",
+    )
+    parser.add_argument("--verbosity", type=int, default=1)
+    parser.add_argument(
+        "--digest",
+        action="store_true",
+        help="Spool all messages and flush them as digest in the last run.",
+    )
+    parser.add_argument(
+        "--outbox",
+        action="store_true",
+        help="Queue messages in an outbox, only queueing is measured.",
+    )
+    parser.add_argument("--retry-delay", type=float, default=0.1)
+    parser.add_argument("--rate-limit", type=float, default=0)
+    parser.add_argument("--rate-burst", type=int, default=1)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", default="429")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--autopkglib", default="/Library/AutoPkg")
+    parser.add_argument(
+        "--json", action="store_true", help="Print the results as JSON."
+    )
+    return parser.parse_args()
+
+
+def run_notifier(args, webhook_url):
+    """
+    Run the notifier once per synthetic recipe, return the latencies in
+    seconds, the number of failed runs and the total seconds.
+    """
+    # pylint: disable=C0415,E0401
+    from autopkglib import ProcessorError
+    from MunkiRepoTeamsNotifier import MunkiRepoTeamsNotifier
+
+    latencies = []
+    failures = 0
+    with tempfile.TemporaryDirectory() as state_dir:
+        start = perf_counter()
+        for index in range(args.count):
+            processor = MunkiRepoTeamsNotifier(
+                env=synthetic_env(index, args, webhook_url, state_dir)
+            )
+            run_start = perf_counter()
+            try:
+                with open(os.devnull, "w", encoding="utf-8") as devnull:
+                    stdout = sys.stdout
+                    sys.stdout = devnull
+                    try:
+                        processor.main()
+                    finally:
+                        sys.stdout = stdout
+            except ProcessorError:
+                failures += 1
+            latencies.append(perf_counter() - run_start)
+        elapsed = perf_counter() - start
+
+    return latencies, failures, elapsed
+
+
+def print_results(results):
+    print(
+        f"{results['runs']} runs in {results['seconds']} s, "
+        f"{results['messages_per_second']} messages/s, "
+        f"{results['failed_runs']} failed"
+    )
+    print(
+        "latency "
+        + ", ".join(
+            f"{name} {value} ms"
+            for name, value in results["latency_ms"].items()
+        )
+    )
+    if results["webhook"]:
+        print(f"webhook {json.dumps(results['webhook'])}")
+
+
+def main():
+    args = parse_arguments()
+
+    sys.path[:0] = [args.autopkglib, SHARED_PROCESSORS_DIR, TOOLS_DIR]
+    # pylint: disable=C0415,E0401
+    from teams_webhook_standin import TeamsWebhookStandIn, status_list
+
+    standin = None
+    webhook_url = args.url
+    if not webhook_url:
+        standin = TeamsWebhookStandIn(
+            fail_rate=args.fail_rate,
+            fail_status=status_list(args.fail_status),
+            latency=args.latency,
+            jitter=args.jitter,
+            seed=args.seed,
+        ).start()
+        webhook_url = standin.url
+
+    latencies, failures, elapsed = run_notifier(args, webhook_url)
+
+    if standin:
+        standin.stop()
+
+    results = {
+        "runs": args.count,
+        "failed_runs": failures,
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(args.count / elapsed, 1),
+        "latency_ms": {
+            name: round(percentile(latencies, share) * 1000, 1)
+            for name, share in (
+                ("p50", 0.5),
+                ("p90", 0.9),
+                ("p99", 0.99),
+                ("max", 1.0),
+            )
+        },
+        "webhook": standin.stats() if standin else {},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Known answer tests and timings for the built-in AES-CBC decryption.
+
+Checks aes_cbc_decrypt of FileZillaURLProvider against the example vectors
+of FIPS-197 appendix C for all key sizes and the CBC vectors of NIST
+SP 800-38A F.2. If the cryptography package is installed, random data is
+decrypted with both and the results and times are compared.
+
+    ./tools/check_aes_vectors.py --size 1000000
+
+autopkglib is imported from AutoPkg's installation, use --autopkglib for
+another location. Exits with 1 if any result differs.
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FILEZILLA_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "FileZilla")
+
+SP800_38A_PLAINTEXT = (
+    "6bc1bee22e409f96e93d7e117393172a"
+    "ae2d8a571e03ac9c9eb76fac45af8e51"
+    "30c81c46a35ce411e5fbc1191a0a52ef"
+    "f69f2445df4f9b17ad2b417be66c3710"
+)
+SP800_38A_IV = "000102030405060708090a0b0c0d0e0f"
+
+# Name, key, IV, ciphertext and plaintext as hex. The single block FIPS-197
+# examples are CBC with a zero IV.
+VECTORS = (
+    (
+        "FIPS-197 C.1 AES-128",
+        "000102030405060708090a0b0c0d0e0f",
+        "00" * 16,
+        "69c4e0d86a7b0430d8cdb78070b4c55a",
+        "00112233445566778899aabbccddeeff",
+    ),
+    (
+        "FIPS-197 C.2 AES-192",
+        "000102030405060708090a0b0c0d0e0f1011121314151617",
+        "00" * 16,
+        "dda97ca4864cdfe06eaf70a0ec0d7191",
+        "00112233445566778899aabbccddeeff",
+    ),
+    (
+        "FIPS-197 C.3 AES-256",
+        "000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f",
+        "00" * 16,
+        "8ea2b7ca516745bfeafc49904b496089",
+        "00112233445566778899aabbccddeeff",
+    ),
+    (
+        "SP 800-38A F.2.2 CBC-AES128",
+        "2b7e151628aed2a6abf7158809cf4f3c",
+        SP800_38A_IV,
+        "7649abac8119b246cee98e9b12e9197d"
+        "5086cb9b507219ee95db113a917678b2"
+        "73bed6b8e3c1743b7116e69e22229516"
+        "3ff1caa1681fac09120eca307586e1a7",
+        SP800_38A_PLAINTEXT,
+    ),
+    (
+        "SP 800-38A F.2.4 CBC-AES192",
+        "8e73b0f7da0e6452c810f32b809079e562f8ead2522c6b7b",
+        SP800_38A_IV,
+        "4f021db243bc633d7178183a9fa071e8"
+        "b4d9ada9ad7dedf4e5e738763f69145a"
+        "571b242012fb7ae07fa9baac3df102e0"
+        "08b0e27988598881d920a9e64f5615cd",
+        SP800_38A_PLAINTEXT,
+    ),
+    (
+        "SP 800-38A F.2.6 CBC-AES256",
+        "603deb1015ca71be2b73aef0857d77811f352c073b6108d72d9810a30914dff4",
+        SP800_38A_IV,
+        "f58c4c04d6e5f1ba779eabfb5f7bfbd6"
+        "9cfc4e967edb808d679f777bc6702c7d"
+        "39f23369a9d9bacfa530e26304231461"
+        "b2eb05e2c39be9fcda6c19078c6a9d1b",
+        SP800_38A_PLAINTEXT,
+    ),
+)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=256 * 1024,
+        help="Bytes of random data to time, rounded to whole blocks.",
+    )
+    parser.add_argument("--autopkglib", default="/Library/AutoPkg")
+    return parser.parse_args()
+
+
+def cryptography_decrypt():
+    """Return a decryption function using cryptography, None without."""
+    try:
+        # pylint: disable=C0415,E0401
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.ciphers import (
+            Cipher,
+            algorithms,
+            modes,
+        )
+    except ImportError:
+        return None
+
+    def decrypt(cipher, key, iv):
+        decryptor = Cipher(
+            algorithms.AES(key), modes.CBC(iv), backend=default_backend()
+        ).decryptor()
+        return decryptor.update(cipher) + decryptor.finalize()
+
+    return decrypt
+
+
+def check_vectors(implementations):
+    """Print the result of each vector per implementation."""
+    failed = False
+    for name, key, iv, cipher, plain in VECTORS:
+        results = {
+            label: decrypt(
+                bytes.fromhex(cipher), bytes.fromhex(key), bytes.fromhex(iv)
+            )
+            == bytes.fromhex(plain)
+            for label, decrypt in implementations.items()
+        }
+        print(
+            f"{name:<32}"
+            + "".join(
+                f" {label}: {'ok' if ok else 'FAIL'}"
+                for label, ok in results.items()
+            )
+        )
+        failed = failed or not all(results.values())
+    return failed
+
+
+def time_random_data(implementations, size):
+    """Decrypt random data with every implementation and compare them."""
+    cipher = os.urandom(max(size // 16, 1) * 16)
+    key, iv = os.urandom(32), os.urandom(16)
+
+    results = {}
+    for label, decrypt in implementations.items():
+        # Tables and imports are set up on first use, don't time them
+        decrypt(cipher[:16], key, iv)
+        start = perf_counter()
+        results[label] = decrypt(cipher, key, iv)
+        elapsed = perf_counter() - start
+        print(
+            f"{label:<14} {len(cipher) / 1024:>8.0f} KB {elapsed * 1000:>9.1f}"
+            f" ms {len(cipher) / elapsed / 1e6:>8.2f} MB/s"
+        )
+    return len(set(results.values())) > 1
+
+
+def main():
+    args = parse_arguments()
+
+    sys.path[:0] = [args.autopkglib, FILEZILLA_DIR]
+    # pylint: disable=C0415,E0401
+    from FileZillaURLProvider import aes_cbc_decrypt
+
+    implementations = {"built-in": aes_cbc_decrypt}
+    decrypt = cryptography_decrypt()
+    if decrypt:
+        implementations["cryptography"] = decrypt
+    else:
+        print("cryptography is not installed, comparing with the vectors only")
+
+    failed = check_vectors(implementations)
+    if time_random_data(implementations, args.size):
+        print("Results for random data differ")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
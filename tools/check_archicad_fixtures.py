@@ -0,0 +1,223 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Offline correctness check and parser benchmark for ARCHICADUpdatesProcessor.
+
+Every page in tools/archicad_fixtures is parsed without network access and
+_get_category_id, _get_platform_id and _find_available_builds are run for
+the cases in expected.json. Each page that parses is also checked as
+synthetically inflated copy with --inflate times the downloads. Parse time
+and peak memory are reported per page.
+
+    ./tools/check_archicad_fixtures.py --inflate 10 --repeat 5
+
+autopkglib is imported from AutoPkg's installation, use --autopkglib for
+another location. Exits with 1 if any check failed.
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import html
+import json
+import os
+import statistics
+import sys
+import tracemalloc
+from time import perf_counter
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TOOLS_DIR, "archicad_fixtures")
+ARCHICAD_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "archicad_updates")
+
+
+def inflate_page(module, page_path, factor):
+    """
+    Return a page with factor times the downloads of the given one. The
+    copies get other major versions, so the expected results still apply.
+    """
+    with open(page_path, "rb") as page_file:
+        attributes = module.extract_attributes(
+            page_file, module.PAGE_ATTRIBUTES
+        )
+    downloads = json.loads(attributes["downloads"])
+
+    inflated = list(downloads)
+    for copy in range(1, factor):
+        for download in downloads:
+            if isinstance(download, dict) and download.get("version"):
+                download = dict(
+                    download,
+                    version=str(int(download["version"]) + 100 * copy),
+                )
+            inflated.append(download)
+    attributes["downloads"] = json.dumps(inflated)
+
+    markup = " ".join(
+        f":{name}='{html.escape(value, quote=True)}'"
+        for name, value in attributes.items()
+    )
+    return f"<html><body><div {markup}></div></body></html>".encode()
+
+
+def parse(module, processor, page):
+    """Parse a page given as path or bytes, bypassing the catalog cache."""
+    module._CATALOG_CACHE.clear()  # pylint: disable=W0212
+    return processor._get_catalog(page)  # pylint: disable=W0212
+
+
+def measure(module, processor, page, repeat):
+    """Return median parse seconds and peak traced memory in bytes."""
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        parse(module, processor, page)
+        timings.append(perf_counter() - start)
+
+    tracemalloc.start()
+    parse(module, processor, page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(timings), peak
+
+
+def check_case(processor, page_data, catalog, case, processor_error):
+    """Run the three extraction functions for a case, return failures."""
+    variant = case["variant"]
+    # pylint: disable=W0212
+    try:
+        category_id = processor._get_category_id(page_data)
+        platform_id = processor._get_platform_id(
+            page_data, variant["ARCHITECTURE"]
+        )
+        builds = processor._find_available_builds(
+            catalog,
+            {
+                "category_id": category_id,
+                "platform_id": platform_id,
+                "major_version": variant["major_version"],
+                "localization": variant["localization"],
+                "release_type": variant["release_type"],
+            },
+        )
+    except processor_error as err:
+        if case.get("error") and case["error"] in str(err):
+            return []
+        return [f"{variant}: unexpected error {err}"]
+
+    if case.get("error"):
+        return [f"{variant}: expected error '{case['error']}'"]
+
+    failures = []
+    for name, value in (
+        ("category_id", category_id),
+        ("platform_id", platform_id),
+        ("builds", list(builds)),
+    ):
+        if value != case[name]:
+            failures.append(f"{variant}: {name} is {value}, not {case[name]}")
+    if any(not url for url in builds.values()):
+        failures.append(f"{variant}: builds without url")
+
+    return failures
+
+
+def check_page(module, processor, page, expected, processor_error):
+    """Parse a page and check it against its expectations."""
+    try:
+        page_data, catalog = parse(module, processor, page)
+    except processor_error as err:
+        if expected.get("error") and expected["error"] in str(err):
+            return []
+        return [f"unexpected error {err}"]
+
+    if expected.get("error"):
+        return [f"expected error '{expected['error']}'"]
+
+    failures = []
+    for case in expected["cases"]:
+        failures += check_case(
+            processor, page_data, catalog, case, processor_error
+        )
+    return failures
+
+
+def fixture_pages(module, page_path, expected, inflate):
+    """
+    Return label, page and size of a fixture and of its inflated copy.
+    Pages expected to fail are not inflated.
+    """
+    name = os.path.basename(page_path)
+    pages = [(name, page_path, os.path.getsize(page_path))]
+    if not expected.get("error") and inflate > 1:
+        inflated = inflate_page(module, page_path, inflate)
+        pages.append((f"{name} x{inflate}", inflated, len(inflated)))
+    return pages
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--inflate", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--autopkglib", default="/Library/AutoPkg")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    sys.path[:0] = [args.autopkglib, ARCHICAD_DIR]
+    # pylint: disable=C0415,E0401
+    import ARCHICADUpdatesProcessor as module
+
+    processor = module.ARCHICADUpdatesProcessor(env={})
+
+    with open(
+        os.path.join(args.fixtures, "expected.json"), encoding="utf-8"
+    ) as expected_file:
+        expectations = json.load(expected_file)
+
+    failed = False
+    print(f"{'page':<40} {'bytes':>9} {'parse ms':>9} {'peak KiB':>9}  result")
+    for name, expected in sorted(expectations.items()):
+        for label, page, size in fixture_pages(
+            module, os.path.join(args.fixtures, name), expected, args.inflate
+        ):
+            failures = check_page(
+                module, processor, page, expected, module.ProcessorError
+            )
+            timing, peak = (
+                (0, 0)
+                if expected.get("error")
+                else measure(module, processor, page, args.repeat)
+            )
+            print(
+                f"{label:<40} {size:>9} {timing * 1000:>9.2f} "
+                f"{peak / 1024:>9.1f}  {'FAIL' if failures else 'ok'}"
+            )
+            for failure in failures:
+                print(f"    {failure}")
+            failed = failed or bool(failures)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Offline correctness check and stage timings for FileZillaURLProvider.
+
+Every page in tools/filezilla_fixtures is processed via page_path, so
+parse_html_div, decrypt_string, the link extraction and
+parse_version_from_url run without network access. The pages were
+encrypted locally with AES-CBC, key and IV are in their v1 and v2
+attributes just like on the real page. Downloads and errors are compared
+with expected.json and the median stage_timings are printed per page.
+
+Saved copies of the live page can be passed as arguments, they have to
+resolve all architectures:
+
+    ./tools/check_filezilla_fixtures.py --repeat 5 ~/Downloads/download.html
+
+autopkglib is imported from AutoPkg's installation, use --autopkglib for
+another location. Exits with 1 if any page drifted from its expectations.
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import json
+import os
+import statistics
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TOOLS_DIR, "filezilla_fixtures")
+FILEZILLA_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "FileZilla")
+STAGES = ("fetch", "parse", "decrypt", "links", "version")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument(
+        "pages", nargs="*", help="Saved live pages to check as well."
+    )
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--archs", default="arm64,x86")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--autopkglib", default="/Library/AutoPkg")
+    return parser.parse_args()
+
+
+def process(module, page_path, archs, processor_error):
+    """
+    Run the provider on a saved page, return its downloads or error and
+    the stage timings in milliseconds.
+    """
+    processor = module.FileZillaURLProvider(
+        env={"page_path": page_path, "ARCHS": archs, "verbose": 0}
+    )
+    try:
+        processor.main()
+    except processor_error as err:
+        result = {"error": str(err)}
+    else:
+        result = {"downloads": processor.env["filezilla_downloads"]}
+    timings = {
+        name: seconds * 1000
+        for name, seconds in processor.stage_timings.items()
+    }
+    return result, timings
+
+
+def compare(result, expected):
+    """Return the differences between a result and its expectations."""
+    if expected.get("error"):
+        error = result.get("error", "")
+        stage = f"stage '{expected.get('stage', '')}'"
+        if expected["error"] in error and stage in error:
+            return []
+        return [f"expected error '{expected['error']}' in {stage}"] + (
+            [f"got {error}"] if error else []
+        )
+
+    if result.get("error"):
+        return [f"unexpected error {result['error']}"]
+
+    failures = []
+    for arch, download in expected.get("downloads", {}).items():
+        found = result["downloads"].get(arch)
+        if found != download:
+            failures.append(f"{arch}: {found}, expected {download}")
+    return failures
+
+
+def check_page(module, page_path, expected, args, processor_error):
+    """Check a page and return its failures and median stage timings."""
+    archs = [arch for arch in args.archs.split(",") if arch]
+    runs = [
+        process(module, page_path, archs, processor_error)
+        for _ in range(args.repeat)
+    ]
+    result = runs[0][0]
+    failures = compare(result, expected)
+
+    timings = {}
+    for stage in STAGES:
+        values = [run[1][stage] for run in runs if stage in run[1]]
+        if values:
+            timings[stage] = statistics.median(values)
+    return failures, timings
+
+
+def main():
+    args = parse_arguments()
+    args.repeat = max(args.repeat, 1)
+
+    sys.path[:0] = [args.autopkglib, FILEZILLA_DIR]
+    # pylint: disable=C0415,E0401
+    import FileZillaURLProvider as module
+    from autopkglib import ProcessorError
+
+    with open(
+        os.path.join(args.fixtures, "expected.json"), encoding="utf-8"
+    ) as expected_file:
+        expectations = json.load(expected_file)
+
+    # Live pages only have to resolve all architectures, in any version
+    pages = [
+        (os.path.join(args.fixtures, name), expected)
+        for name, expected in sorted(expectations.items())
+    ] + [(page_path, {}) for page_path in args.pages]
+
+    failed = False
+    print(
+        f"{'page':<32}"
+        + "".join(f" {stage + ' ms':>11}" for stage in STAGES)
+        + "  result"
+    )
+    for page_path, expected in pages:
+        failures, timings = check_page(
+            module, page_path, expected, args, ProcessorError
+        )
+        print(
+            f"{os.path.basename(page_path):<32}"
+            + "".join(
+                f" {timings[stage]:>11.3f}" if stage in timings else " " * 12
+                for stage in STAGES
+            )
+            + f"  {'FAIL' if failures else 'ok'}"
+        )
+        for failure in failures:
+            print(f"    {failure}")
+        failed = failed or bool(failures)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Checks that TeamsMessage.to_json matches a plain json.dumps of the card.
+
+TeamsMessage renders its Adaptive Card from precompiled templates. For
+messages with and without image, subtitle, links and digest sections, and
+with non-ASCII facts, the result has to be byte-identical to serializing
+the fully nested card at once. Both ways are timed as well.
+
+    ./tools/check_teams_message_json.py --repeat 2000
+
+autopkglib is imported from AutoPkg's installation, use --autopkglib for
+another location. Exits with 1 if any message differs.
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from time import perf_counter
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARED_PROCESSORS_DIR = os.path.join(
+    os.path.dirname(TOOLS_DIR), "SharedProcessors"
+)
+
+FACTS = [
+    ("new Version", "12.4.1"),
+    ("in Catalogs", ["testing", "production"]),
+    ("Größe", "1,5 GB – “quoted” \\ backslash"),
+    ("名前", "☃ Snowman\n\ttabbed"),
+]
+
+LINKS = [
+    {"url": "https://example.com/a?b=1&c=ä", "name": "Öffnen", "icon": "Open"},
+    {"url": "https://example.com/b", "name": "Plain", "mode": "secondary"},
+]
+
+SECTIONS = [
+    ("Firefox (firefox)", [{"name": "new Version", "value": "128.0"}]),
+    ("Zoom (zoom.us)", [{"name": "in Catalogs", "value": "tésting"}]),
+]
+
+
+def nested_card(message):
+    """Return the Adaptive Card of a message as one nested dictionary."""
+    items = []
+    if message.title:
+        items.append(
+            {
+                "type": "TextBlock",
+                "text": message.title,
+                "wrap": True,
+                "style": "heading",
+            }
+        )
+    if message.subtitle:
+        items.append(
+            {
+                "type": "TextBlock",
+                "text": message.subtitle,
+                "wrap": True,
+                "style": "columnHeader",
+            }
+        )
+    if message.facts:
+        items.append(
+            {
+                "type": "FactSet",
+                "facts": [
+                    {"title": fact["name"], "value": fact["value"]}
+                    for fact in message.facts
+                ],
+            }
+        )
+    for section in message.sections:
+        items += [
+            {
+                "type": "TextBlock",
+                "text": section["title"],
+                "wrap": True,
+                "weight": "bolder",
+                "separator": True,
+            },
+            {
+                "type": "FactSet",
+                "facts": [
+                    {"title": fact["name"], "value": fact["value"]}
+                    for fact in section["facts"]
+                ],
+            },
+        ]
+    if message.links:
+        items.append(
+            {
+                "type": "ActionSet",
+                "actions": [
+                    message.link_action(link) for link in message.links
+                ],
+            }
+        )
+
+    if message.image_url:
+        body = [
+            {
+                "type": "ColumnSet",
+                "columns": [
+                    {
+                        "type": "Column",
+                        "width": "auto",
+                        "items": [
+                            {
+                                "type": "Image",
+                                "url": message.image_url,
+                                "size": "Medium",
+                            }
+                        ],
+                    },
+                    {"type": "Column", "width": "stretch", "items": items},
+                ],
+            }
+        ]
+    else:
+        body = [{"type": "Container", "items": items}]
+
+    return {
+        "type": "AdaptiveCard",
+        "$schema": "https://adaptivecards.io/schemas/adaptive-card.json",
+        "version": "1.5",
+        "body": body,
+    }
+
+
+def build_messages(message_class):
+    """Yield a label and a message for every combination of features."""
+    for image, subtitle, links, sections in itertools.product(
+        (False, True), repeat=4
+    ):
+        message = message_class(
+            title="Fïrefox (firefox)",
+            image_url="https://example.com/icons/Fïrefox.png" if image else "",
+        )
+        if subtitle:
+            message.set_subtitle("MunkiImporter and AutoStaging")
+        for name, value in FACTS:
+            message.add_fact(name, value)
+        if links:
+            for link in LINKS:
+                message.add_link(link)
+        if sections:
+            for title, facts in SECTIONS:
+                message.add_section(title, facts)
+
+        label = ", ".join(
+            name if enabled else f"no {name}"
+            for name, enabled in (
+                ("image", image),
+                ("subtitle", subtitle),
+                ("links", links),
+                ("sections", sections),
+            )
+        )
+        yield label, message
+
+
+def time_per_call(function, repeat):
+    """Return the microseconds a call of function takes on average."""
+    start = perf_counter()
+    for _ in range(repeat):
+        function()
+    return (perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--autopkglib", default="/Library/AutoPkg")
+    args = parser.parse_args()
+
+    sys.path[:0] = [args.autopkglib, SHARED_PROCESSORS_DIR]
+    # pylint: disable=C0415,E0401
+    from TeamsMessage import TeamsMessage
+
+    failed = False
+    print(f"{'message':<50} {'to_json µs':>11} {'dumps µs':>9}  result")
+    for label, message in build_messages(TeamsMessage):
+        expected = json.dumps(nested_card(message))
+        identical = message.to_json() == expected
+        template_time = time_per_call(message.to_json, args.repeat)
+        dumps_time = time_per_call(
+            lambda message=message: json.dumps(nested_card(message)),
+            args.repeat,
+        )
+        print(
+            f"{label:<50} {template_time:>11.1f} {dumps_time:>9.1f}  "
+            f"{'ok' if identical else 'FAIL'}"
+        )
+        if not identical:
+            print(f"    expected {expected}")
+            print(f"    got      {message.to_json()}")
+        failed = failed or not identical
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
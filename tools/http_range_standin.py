@@ -0,0 +1,336 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Local download server with HTTP range support, to test ChunkedURLDownloader
+without a vendor's CDN.
+
+Any path serves the same file, either a given one or random bytes of the
+requested size, with ETag, Last-Modified and single byte ranges. Shares of
+the GET requests are answered with injected errors, e.g. HTTP 500, or cut
+off halfway through the body, and every answer can be delayed. Range and
+HEAD support can be switched off. GET /stats returns the counters as JSON.
+
+    ./tools/http_range_standin.py --port 8809 --size 200000000 \
+        --fail-rate 0.5 --fail-status 500,503
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+
+__all__ = ["HTTPRangeStandIn", "status_list"]
+
+# Bytes written to the socket at once
+WRITE_SIZE = 256 * 1024
+
+# Options of HTTPRangeStandIn besides host, port and content
+DEFAULT_OPTIONS = {
+    "fail_rate": 0.0,
+    "fail_status": (500,),
+    "fail_first": 0,
+    "truncate_rate": 0.0,
+    "latency": 0.0,
+    "ranges": True,
+    "head": True,
+    "seed": None,
+    "verbose": False,
+}
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def parse_range(value, size):
+    """
+    Return first and last byte of a single range header value, None if the
+    value is no satisfiable single range.
+    """
+    match = RANGE_PATTERN.match(value.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range, the last N bytes
+        return max(size - int(last), 0), size - 1
+    last = min(int(last), size - 1) if last else size - 1
+    if int(first) > last:
+        return None
+    return int(first), last
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Answers HEAD and GET requests as configured on the server."""
+
+    server_version = "HTTPRangeStandIn"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        if self.server.standin.options["verbose"]:
+            super().log_message(format, *args)
+
+    def send_text(self, status, text):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_file_headers(self, status, length, first=0, last=None):
+        standin = self.server.standin
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        for name, value in standin.validators.items():
+            self.send_header(name, value)
+        if standin.options["ranges"]:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header(
+                "Content-Range", f"bytes {first}-{last}/{len(standin.content)}"
+            )
+        self.end_headers()
+
+    def do_HEAD(self):  # pylint: disable=C0103
+        standin = self.server.standin
+        standin.count("head_requests")
+        if not standin.options["head"]:
+            self.send_text(405, "HEAD not allowed")
+            return
+        self.send_file_headers(200, len(standin.content))
+
+    def do_GET(self):  # pylint: disable=C0103
+        standin = self.server.standin
+        if self.path == "/stats":
+            self.send_text(200, json.dumps(standin.stats()))
+            return
+
+        status, truncate = standin.answer()
+        if status:
+            self.send_text(status, f"Injected HTTP {status}")
+            return
+
+        content = standin.content
+        first, last = 0, len(content) - 1
+        requested = self.headers.get("Range")
+        if requested and standin.options["ranges"]:
+            byte_range = parse_range(requested, len(content))
+            if not byte_range:
+                standin.count("rejected")
+                self.send_text(416, f"Unsatisfiable range {requested}")
+                return
+            first, last = byte_range
+            standin.count("range_requests")
+            self.send_file_headers(206, last - first + 1, first, last)
+        else:
+            self.send_file_headers(200, len(content))
+
+        if truncate:
+            # Announce the full length, but send only half of it
+            last = first + (last - first) // 2
+            standin.count("truncated")
+            self.close_connection = True
+
+        offset = first
+        while offset <= last:
+            end = min(offset + WRITE_SIZE, last + 1)
+            self.wfile.write(content[offset:end])
+            standin.count("bytes", end - offset)
+            offset = end
+
+
+class HTTPRangeStandIn:
+    """
+    Threaded HTTP server serving one file with byte ranges. Use start()
+    and stop() to run it in the background, e.g. from a benchmark. Keyword
+    options are listed with their defaults in DEFAULT_OPTIONS.
+    """
+
+    def __init__(self, content, host="127.0.0.1", port=0, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise TypeError(f"Unknown options: {', '.join(sorted(unknown))}")
+        self.options = {**DEFAULT_OPTIONS, **options}
+        self.content = content
+        self.validators = {
+            "ETag": f'"{hashlib.sha256(content).hexdigest()[:16]}"',
+            "Last-Modified": formatdate(usegmt=True),
+        }
+        self.random = random.Random(self.options["seed"])
+        self.lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "head_requests": 0,
+            "range_requests": 0,
+            "injected": 0,
+            "truncated": 0,
+            "rejected": 0,
+            "bytes": 0,
+        }
+        self.httpd = ThreadingHTTPServer((host, port), RangeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/download.dmg"
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def reset(self, **options):
+        """Change options and zero the counters between runs."""
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise TypeError(f"Unknown options: {', '.join(sorted(unknown))}")
+        with self.lock:
+            self.options.update(options)
+            self.counters = dict.fromkeys(self.counters, 0)
+
+    def answer(self):
+        """
+        Return the status to inject for a GET request, 0 for none, and
+        whether the body is to be cut off.
+        """
+        options = self.options
+        with self.lock:
+            self.counters["requests"] += 1
+            inject = self.counters["requests"] <= options["fail_first"] or (
+                self.random.random() < options["fail_rate"]
+            )
+            status = (
+                self.random.choice(options["fail_status"]) if inject else 0
+            )
+            truncate = not inject and (
+                self.random.random() < options["truncate_rate"]
+            )
+            if inject:
+                self.counters["injected"] += 1
+
+        if options["latency"]:
+            sleep(options["latency"])
+        return status, truncate
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def status_list(value):
+    """Parse a comma separated list of HTTP status codes."""
+    return [int(status) for status in value.split(",") if status]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8809)
+    parser.add_argument("--file", help="File to serve instead of random data.")
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=64 * 1024 * 1024,
+        help="Bytes of random data to serve without --file.",
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="Share of GET requests answered with an injected error, 0 to 1.",
+    )
+    parser.add_argument(
+        "--fail-status",
+        type=status_list,
+        default=[500],
+        help="Comma separated status codes to inject, e.g. 500,503.",
+    )
+    parser.add_argument(
+        "--fail-first",
+        type=int,
+        default=0,
+        help="Answer the first N GET requests with an injected error.",
+    )
+    parser.add_argument(
+        "--truncate-rate",
+        type=float,
+        default=0.0,
+        help="Share of GET requests cut off halfway through the body.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per answer."
+    )
+    parser.add_argument(
+        "--no-ranges", action="store_true", help="Ignore Range headers."
+    )
+    parser.add_argument(
+        "--no-head", action="store_true", help="Refuse HEAD requests."
+    )
+    parser.add_argument("--seed", type=int, help="Seed for data and errors.")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as content_file:
+            content = content_file.read()
+    else:
+        content = random.Random(args.seed).randbytes(args.size)
+
+    standin = HTTPRangeStandIn(
+        content,
+        host=args.host,
+        port=args.port,
+        fail_rate=args.fail_rate,
+        fail_status=args.fail_status,
+        fail_first=args.fail_first,
+        truncate_rate=args.truncate_rate,
+        latency=args.latency,
+        ranges=not args.no_ranges,
+        head=not args.no_head,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+    print(f"Download stand-in serving {len(content)} bytes on {standin.url}")
+    try:
+        standin.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.httpd.server_close()
+        print(json.dumps(standin.stats()))
+
+
+if __name__ == "__main__":
+    main()
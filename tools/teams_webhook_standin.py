@@ -0,0 +1,312 @@
+#!/usr/local/autopkg/python
+#
+# Copyright 2026 wycomco GmbH
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Local stand-in for a Microsoft Teams webhook, to test MunkiRepoTeamsNotifier
+without posting to a real channel.
+
+Adaptive Cards posted to any path are checked for size and structure.
+Configurable shares of the requests are answered with injected errors, e.g.
+HTTP 429 or 503, and every answer can be delayed. GET /stats returns the
+counters as JSON.
+
+    ./tools/teams_webhook_standin.py --port 8808 --fail-rate 0.2 \
+        --fail-status 429,503 --latency 0.05
+"""
+
+# pylint: disable=invalid-name,duplicate-code
+
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+
+__all__ = ["TeamsWebhookStandIn", "validate_card"]
+
+# Teams rejects webhook payloads larger than 28 KB
+MAX_PAYLOAD_BYTES = 28 * 1024
+
+# Options of TeamsWebhookStandIn besides host and port
+DEFAULT_OPTIONS = {
+    "fail_rate": 0.0,
+    "fail_status": (429,),
+    "fail_first": 0,
+    "latency": 0.0,
+    "jitter": 0.0,
+    "retry_after": 1,
+    "max_bytes": MAX_PAYLOAD_BYTES,
+    "log_path": None,
+    "seed": None,
+    "verbose": False,
+}
+
+
+def validate_card(payload, max_bytes=MAX_PAYLOAD_BYTES):
+    """
+    Return an error message if Teams would refuse the payload, an empty
+    string otherwise.
+    """
+    if len(payload) > max_bytes:
+        return f"Payload has {len(payload)} bytes, at most {max_bytes} allowed"
+
+    try:
+        card = json.loads(payload)
+    except ValueError as err:
+        return f"Payload is no valid JSON: {err}"
+
+    return card_error(card)
+
+
+def card_error(card):
+    """Return an error message if the parsed card is malformed."""
+    if not isinstance(card, dict) or card.get("type") != "AdaptiveCard":
+        return "Payload is no Adaptive Card"
+    if not card.get("version"):
+        return "Adaptive Card has no version"
+    if not isinstance(card.get("body"), list):
+        return "Adaptive Card has no body list"
+
+    elements = list(card["body"])
+    while elements:
+        element = elements.pop()
+        error = element_error(element)
+        if error:
+            return error
+        for key in ("items", "columns"):
+            elements.extend(element.get(key, []))
+
+    return ""
+
+
+def element_error(element):
+    """Return an error message if a single card element is malformed."""
+    if not isinstance(element, dict) or not isinstance(
+        element.get("type"), str
+    ):
+        return f"Card element without type: {element}"
+    for fact in element.get("facts", []):
+        if not isinstance(fact.get("title"), str):
+            return f"Fact without title: {fact}"
+    return ""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers webhook posts as configured on the server."""
+
+    server_version = "TeamsWebhookStandIn"
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        if self.server.standin.options["verbose"]:
+            super().log_message(format, *args)
+
+    def send_text(self, status, text, headers=None):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=C0103
+        if self.path != "/stats":
+            self.send_text(404, "Not found")
+            return
+        self.send_text(200, json.dumps(self.server.standin.stats()))
+
+    def do_POST(self):  # pylint: disable=C0103
+        standin = self.server.standin
+        payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, text = standin.answer(
+            self.headers.get("Content-Type", ""), payload
+        )
+        headers = {}
+        if status == 429:
+            headers["Retry-After"] = str(standin.options["retry_after"])
+        self.send_text(status, text, headers)
+
+
+class TeamsWebhookStandIn:
+    """
+    Threaded HTTP server mimicking a Teams webhook. Use start() and stop()
+    to run it in the background, e.g. from a benchmark. Keyword options are
+    listed with their defaults in DEFAULT_OPTIONS.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise TypeError(f"Unknown options: {', '.join(sorted(unknown))}")
+        self.options = {**DEFAULT_OPTIONS, **options}
+        self.random = random.Random(self.options["seed"])
+        self.lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "accepted": 0,
+            "rejected": 0,
+            "injected": 0,
+            "bytes": 0,
+        }
+        self.httpd = ThreadingHTTPServer((host, port), StandInHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/webhook"
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def answer(self, content_type, payload):
+        """Return HTTP status and body for a posted payload."""
+        options = self.options
+        with self.lock:
+            self.counters["requests"] += 1
+            request_number = self.counters["requests"]
+            inject = request_number <= options["fail_first"] or (
+                self.random.random() < options["fail_rate"]
+            )
+            status = (
+                self.random.choice(options["fail_status"]) if inject else 0
+            )
+            delay = options["latency"] + self.random.uniform(
+                0, options["jitter"]
+            )
+
+        if delay:
+            sleep(delay)
+
+        if inject:
+            with self.lock:
+                self.counters["injected"] += 1
+            return status, f"Injected HTTP {status}"
+
+        if not content_type.startswith("application/json"):
+            status, error = 415, f"Unexpected Content-Type: {content_type}"
+        else:
+            error = validate_card(payload, options["max_bytes"])
+            status = 413 if len(payload) > options["max_bytes"] else 400
+
+        with self.lock:
+            if error:
+                self.counters["rejected"] += 1
+            else:
+                self.counters["accepted"] += 1
+                self.counters["bytes"] += len(payload)
+                if options["log_path"]:
+                    with open(options["log_path"], "ab") as log_file:
+                        log_file.write(payload + b"\n")
+
+        if error:
+            return status, error
+        return 200, "1"
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def status_list(value):
+    """Parse a comma separated list of HTTP status codes."""
+    return [int(status) for status in value.split(",") if status]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n", maxsplit=1)[0]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="Share of requests answered with an injected error, 0 to 1.",
+    )
+    parser.add_argument(
+        "--fail-status",
+        type=status_list,
+        default=[429],
+        help="Comma separated status codes to inject, e.g. 429,500,503.",
+    )
+    parser.add_argument(
+        "--fail-first",
+        type=int,
+        default=0,
+        help="Answer the first N requests with an injected error.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds per answer."
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="Up to this many seconds are added to the latency at random.",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=int,
+        default=1,
+        help="Retry-After header value of injected 429 answers.",
+    )
+    parser.add_argument("--max-bytes", type=int, default=MAX_PAYLOAD_BYTES)
+    parser.add_argument(
+        "--log", help="Append every accepted card as JSON line to this file."
+    )
+    parser.add_argument("--seed", type=int, help="Seed for error injection.")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    standin = TeamsWebhookStandIn(
+        host=args.host,
+        port=args.port,
+        fail_rate=args.fail_rate,
+        fail_status=args.fail_status,
+        fail_first=args.fail_first,
+        latency=args.latency,
+        jitter=args.jitter,
+        retry_after=args.retry_after,
+        max_bytes=args.max_bytes,
+        log_path=args.log,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+    print(f"Teams webhook stand-in listening on {standin.url}")
+    try:
+        standin.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.httpd.server_close()
+        print(json.dumps(standin.stats()))
+
+
+if __name__ == "__main__":
+    main()